@@ -1,18 +1,44 @@
 import os
+import io
+import hashlib
 import logging
-from pathlib import Path
-from typing import List, Dict, Optional
-from flask import Flask, request, render_template, jsonify, abort
+import shutil
+import tempfile
+from typing import List, Dict, Optional, Tuple, Iterator, Union, BinaryIO
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+from flask import (
+    Blueprint, Flask, Request, request, render_template, jsonify, Response, stream_with_context, g, current_app, send_file,
+    has_request_context
+)
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
-import ebooklib
-from ebooklib import epub
-from pypdf import PdfReader
-import openai
+from werkzeug.exceptions import TooManyRequests
 from dotenv import load_dotenv
 from functools import wraps
+import math
 import time
+from urllib.parse import quote
+from book_store import BookStore, is_valid_book_id
+from epub_extract import EpubLimitError, iter_epub_assets, iter_epub_documents
+from summary_cache import SummaryCache, make_summary_key
+from text_chunks import CHARS_PER_TOKEN, estimate_tokens, split_into_chunks
+from request_budget import RequestBudget
+from summary_jobs import SummaryJobQueue
+from rate_limiter import RateLimiter
+from search_index import SearchIndex, html_to_text, make_snippet, tokenize
+from compression import COMPRESSIBLE_MIMETYPES, choose_encoding, compress
+from resilience import (AsyncSingleFlight, CircuitBreaker, DeadlineExceededError, SingleFlight, UpstreamUnavailableError,
+                        call_with_retries)
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry, server_timing
+# openai, pypdf and NumPy together take most of a second to import, so they
+# are imported where first used: ReaderState.client, extract_chapters_pdf
+# and extractive_chapter_summary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,142 +47,1040 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Validate required environment variables
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    logger.warning("OPENAI_API_KEY environment variable is not set")
-    raise ValueError("OPENAI_API_KEY environment variable is required")
+class UploadRequest(Request):
+    """
+    Keep uploaded files up to ``UPLOAD_SPOOL_MAX_BYTES`` in memory and spool
+    larger ones to a uniquely named temporary file in the upload folder.
+
+    Werkzeug's default writes anything over 500KB to an anonymous temp file,
+    which the parallel PDF workers cannot open by name.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        if total_content_length is not None and total_content_length <= config['UPLOAD_SPOOL_MAX_BYTES']:
+            return io.BytesIO()
+        os.makedirs(config['UPLOAD_FOLDER'], exist_ok=True)
+        # Deleted on close, which Werkzeug does when the request ends
+        return tempfile.NamedTemporaryFile(dir=config['UPLOAD_FOLDER'], prefix='upload-', suffix='.part')
+
+SUMMARY_STRATEGIES = ('truncate', 'map_reduce', 'auto')
+SUMMARY_MODES = ('remote', 'extractive')
+
+def load_config() -> Dict:
+    """Read the application configuration from environment variables."""
+    return {
+        'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY'),
+        
+        # Security configurations
+        'UPLOAD_FOLDER': os.path.abspath(os.path.join(os.path.dirname(__file__), 'uploads')),
+        'MAX_CONTENT_LENGTH': 50 * 1024 * 1024,  # 50MB max file size
+        'ALLOWED_EXTENSIONS': {'epub', 'pdf'},
+        'RATE_LIMIT': {  # 100 requests per hour per client by default
+            'requests': int(os.getenv('RATE_LIMIT_REQUESTS', '100')),
+            'window': int(os.getenv('RATE_LIMIT_WINDOW', '3600')),
+        },
+        
+        # JSON and HTML bodies of at least min_bytes are gzip/brotli compressed when the client accepts it
+        'COMPRESSION': {
+            'min_bytes': int(os.getenv('COMPRESSION_MIN_BYTES', '1024')),
+            'gzip_level': 6,
+            'brotli_quality': 5,
+        },
+        
+        # Cache configurations
+        'CACHE_FOLDER': os.path.abspath(
+            os.getenv('CACHE_FOLDER', os.path.join(os.path.dirname(__file__), 'cache'))
+        ),
+        'BOOK_CACHE_MAX_BYTES': int(os.getenv('BOOK_CACHE_MAX_BYTES', str(500 * 1024 * 1024))),  # 500MB on disk
+        'UPLOAD_CHUNK_SIZE': 64 * 1024,
+        # Uploads up to this size are parsed straight from memory
+        'UPLOAD_SPOOL_MAX_BYTES': int(os.getenv('UPLOAD_SPOOL_MAX_BYTES', str(8 * 1024 * 1024))),
+        
+        # PDF extraction configurations
+        'PDF_EXTRACT_WORKERS': int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        'PDF_PARALLEL_MIN_PAGES': int(os.getenv('PDF_PARALLEL_MIN_PAGES', '64')),  # Smaller PDFs are parsed in-process
+        
+        # EPUB extraction limits, guarding against zip bombs
+        'EPUB_MAX_UNCOMPRESSED_BYTES': int(os.getenv('EPUB_MAX_UNCOMPRESSED_BYTES', str(200 * 1024 * 1024))),  # Chapter text
+        'EPUB_MAX_MEMBERS': int(os.getenv('EPUB_MAX_MEMBERS', '10000')),
+        # Images, fonts and stylesheets get a separate budget of the same size
+        'EPUB_MAX_ASSET_BYTES': int(os.getenv('EPUB_MAX_ASSET_BYTES', str(200 * 1024 * 1024))),
+        # Assets are immutable: their URL contains the hash of the uploaded book
+        'ASSET_MAX_AGE': 365 * 24 * 3600,
+        
+        # Search configurations
+        'SEARCH': {
+            'max_results': 20,
+            'max_query_chars': 200,
+            'cached_indexes': 16,  # Decoded indexes kept in memory, least recently used dropped first
+        },
+        
+        # Summary configurations
+        'SUMMARY': {
+            'model': 'gpt-3.5-turbo',
+            'max_tokens': 500,
+            'temperature': 0.7,
+            'max_input_chars': 4000,
+            # 'truncate' summarizes the first max_input_chars characters; 'map_reduce'
+            # summarizes token-budgeted chunks concurrently and combines the results;
+            # 'auto' uses map_reduce only for content longer than max_input_chars
+            'strategy': os.getenv('SUMMARY_STRATEGY', 'truncate'),
+            'chunk_tokens': 1000,  # At most max_input_chars / 4, so chunks are never truncated
+            'max_concurrency': int(os.getenv('SUMMARY_MAX_CONCURRENCY', '4')),  # In-flight requests per summary
+            # 'remote' asks the model; 'extractive' picks key sentences locally, in milliseconds
+            'mode': os.getenv('SUMMARY_MODE', 'remote'),
+            # Answer with an extractive summary when the model call fails or times out
+            'fallback': os.getenv('SUMMARY_FALLBACK', 'true').lower() == 'true',
+            # Seconds an interactive summary waits on the model, retries included, before
+            # falling back; background jobs keep the full retry budget. 0 disables the deadline
+            'fallback_after': float(os.getenv('SUMMARY_FALLBACK_AFTER', '15')),
+            'extractive_sentences': 5,
+        },
+        'OPENAI_REQUESTS_PER_MINUTE': int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '120')),  # 0 disables pacing
+        'SUMMARY_JOB_WORKERS': int(os.getenv('SUMMARY_JOB_WORKERS', '4')),
+        'OPENAI_TIMEOUT': {  # seconds
+            'connect': float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5')),
+            'read': float(os.getenv('OPENAI_READ_TIMEOUT', '60')),
+        },
+        'OPENAI_RETRY': {  # Transient failures only: timeouts, connection errors, 408/409/429/5xx
+            'attempts': int(os.getenv('OPENAI_RETRY_ATTEMPTS', '3')),
+            'base_delay': 0.5,  # seconds; attempt n waits a random delay up to base_delay * 2 ** n
+            'max_delay': 8.0,
+        },
+        'OPENAI_CIRCUIT_BREAKER': {
+            'failure_threshold': int(os.getenv('OPENAI_CIRCUIT_FAILURES', '5')),  # Consecutive failures; 0 disables
+            'reset_timeout': float(os.getenv('OPENAI_CIRCUIT_RESET_SECONDS', '30')),
+        },
+        'SUMMARY_CACHE': {
+            'ttl': int(os.getenv('SUMMARY_CACHE_TTL', str(30 * 24 * 3600))),  # 30 days
+            'max_entries': int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '100000')),
+            'memory_entries': 1024,
+            'evict_every': 100,  # Writes between sweeps of expired and surplus rows
+        },
+    }
+
+class lazy_property:
+    """
+    Like ``functools.cached_property``, but threads that read the property
+    at the same time wait for one value instead of each building their own.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # Once set, the instance attribute shadows this descriptor
+        with instance._lazy_lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.func(instance)
+        return instance.__dict__[self.name]
+
+class ReaderMetrics:
+    """Prometheus metrics of one app, served at /metrics."""
+
+    def __init__(self, state: 'ReaderState'):
+        registry = self.registry = Registry()
+        self.upload_bytes = registry.histogram(
+            'book_reader_upload_bytes', 'Size of uploaded books in bytes',
+            buckets=[2 ** n for n in range(16, 27)]  # 64KB to 64MB
+        )
+        self.extract_unit_seconds = registry.histogram(
+            'book_reader_extract_unit_seconds', 'Time to extract one EPUB chapter or PDF page', ['format']
+        )
+        self.extract_book_seconds = registry.histogram(
+            'book_reader_extract_book_seconds', 'Time to extract every chapter or page of a book', ['format']
+        )
+        self.json_seconds = registry.histogram(
+            'book_reader_json_serialize_seconds', 'Time to serialize JSON response bodies',
+            buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+        )
+        self.openai_seconds = registry.histogram(
+            'book_reader_openai_request_seconds',
+            'Latency of chat completion requests; streamed requests are timed until the stream starts',
+            ['mode', 'outcome']
+        )
+        self.openai_tokens = registry.histogram(
+            'book_reader_openai_tokens', 'Tokens used per chat completion request', ['kind'],
+            buckets=[2 ** n for n in range(4, 14)]  # 16 to 8192
+        )
+        self.rate_limit_checks = registry.counter(
+            'book_reader_rate_limit_checks_total', 'Per-client rate limit checks', ['result']
+        )
+        self.summary_fallbacks = registry.counter(
+            'book_reader_summary_fallbacks_total', 'Summaries answered by the extractive engine after the model call failed'
+        )
+        self.openai_retries = registry.counter(
+            'book_reader_openai_retries_total', 'Chat completion requests retried after a transient failure'
+        )
+        
+        registry.callback(
+            'book_reader_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'],
+            lambda: cache_requests(state)
+        )
+        registry.callback(
+            'book_reader_openai_circuit_open', 'Whether calls to the OpenAI API are currently failing fast', (),
+            lambda: [((), int(state.openai_breaker.state == 'open'))], type='gauge'
+        )
+        registry.callback(
+            'book_reader_openai_circuit_rejections_total', 'Chat completion requests refused by the open circuit', (),
+            lambda: [((), state.openai_breaker.rejected)]
+        )
+        registry.callback(
+            'book_reader_summary_coalesced_total', 'Summary requests that shared a concurrent identical request', (),
+            lambda: [((), state.summary_flights.shared + state.async_summary_flights.shared)]
+        )
+        registry.callback(
+            'book_reader_openai_budget_wait_seconds_total', 'Time spent waiting for the shared OpenAI request budget', (),
+            lambda: [((), state.openai_budget.waited)]
+        )
+
+def cache_requests(state: 'ReaderState'):
+    """Read cache hit and miss counters from the caches that keep them."""
+    for cache, stats in (('book', state.book_store.stats()), ('summary', state.summary_cache.stats()),
+                         ('search_index', state.search_index_stats)):
+        yield (cache, 'hit'), stats['hits']
+        yield (cache, 'miss'), stats['misses']
+
+class ReaderState:
+    """
+    The clients, caches and counters of one app, kept in
+    ``app.extensions['book_reader']``.
+
+    Anything that opens files, starts threads or needs a heavy import is
+    built on first use, so creating an app stays cheap.
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self._lazy_lock = threading.RLock()
+        config = app.config
+        
+        # Fails fast while the API keeps failing, for the sync and async clients alike
+        self.openai_breaker = CircuitBreaker(**config['OPENAI_CIRCUIT_BREAKER'])
+        # Concurrent requests for the same uncached summary share one model call;
+        # the ASGI handlers coalesce on the event loop instead of in threads
+        self.summary_flights = SingleFlight()
+        self.async_summary_flights = AsyncSingleFlight()
+        # Every OpenAI request, interactive or background, draws from this budget
+        self.openai_budget = RequestBudget(config['OPENAI_REQUESTS_PER_MINUTE'])
+        
+        # Decoded search indexes of recently searched books
+        self.search_indexes: 'OrderedDict[str, SearchIndex]' = OrderedDict()
+        self.search_indexes_lock = threading.Lock()
+        self.search_index_stats = {'hits': 0, 'misses': 0}
+        
+        # Where uploaded bytes were parsed from; see UploadRequest
+        self.upload_stats = {'in_memory': 0, 'spooled': 0, 'bytes_in_memory': 0, 'bytes_spooled': 0, 'max_bytes': 0}
+        self.upload_stats_lock = threading.Lock()
+        # Time-to-first-token of recent streamed summaries, in seconds
+        self.ttft_samples = deque(maxlen=1000)
+        
+        self.metrics = ReaderMetrics(self)
+
+    @lazy_property
+    def client(self):
+        """
+        The OpenAI client; its connection pool is shared by every request
+        in the process. Retries are handled by create_completion, not the SDK.
+        """
+        config = self.app.config
+        if not config['OPENAI_API_KEY']:
+            raise ValueError("OPENAI_API_KEY is not configured")
+        import openai
+        
+        return openai.OpenAI(
+            api_key=config['OPENAI_API_KEY'],
+            timeout=openai.Timeout(config['OPENAI_TIMEOUT']['read'], connect=config['OPENAI_TIMEOUT']['connect']),
+            max_retries=0
+        )
 
-# Initialize Flask app with security headers
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})  # Allow all origins for testing
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    @lazy_property
+    def book_store(self) -> BookStore:
+        """Parsed books, keyed by the SHA-256 of the uploaded bytes."""
+        config = self.app.config
+        return BookStore(os.path.join(config['CACHE_FOLDER'], 'books'), max_bytes=config['BOOK_CACHE_MAX_BYTES'])
 
-# Security configurations
-app.config['UPLOAD_FOLDER'] = os.path.abspath(os.path.join(os.path.dirname(__file__), 'uploads'))
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
-app.config['ALLOWED_EXTENSIONS'] = {'epub', 'pdf'}
-app.config['RATE_LIMIT'] = {'requests': 100, 'window': 3600}  # 100 requests per hour
+    @lazy_property
+    def summary_cache(self) -> SummaryCache:
+        """Generated summaries, keyed by a hash of the model input and parameters."""
+        config = self.app.config
+        return SummaryCache(os.path.join(config['CACHE_FOLDER'], 'summaries.sqlite3'), **config['SUMMARY_CACHE'])
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    @lazy_property
+    def rate_limiter(self) -> RateLimiter:
+        """Rate limiting, shared by all worker processes through SQLite."""
+        config = self.app.config
+        return RateLimiter(os.path.join(config['CACHE_FOLDER'], 'ratelimit.sqlite3'), **config['RATE_LIMIT'])
 
-# Create uploads directory if it doesn't exist
-Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    @lazy_property
+    def summary_jobs(self) -> SummaryJobQueue:
+        """Background whole-book summarization; results land in the summary cache."""
+        def summarize(content: str) -> Tuple[str, bool]:
+            with self.app.app_context():
+                # Jobs fill the cache with model summaries, so they never settle for the extractive engine
+                return get_cached_summary(content, 'auto', mode='remote', fallback=False)[:2]
+        
+        return SummaryJobQueue(workers=self.app.config['SUMMARY_JOB_WORKERS'], summarize=summarize)
+
+def get_state(app: Optional[Flask] = None) -> ReaderState:
+    """Return the state of ``app``, or of the current app."""
+    return (app or current_app).extensions['book_reader']
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add a phase to the ``Server-Timing`` header of the current request, if there is one."""
+    if has_request_context():
+        g.setdefault('timings', []).append((name, seconds))
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that times serialization of response bodies."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            get_state(self._app).metrics.json_seconds.observe(elapsed)
+            record_timing('json', elapsed)
+
+# Every route and request hook; create_app registers them on each app
+bp = Blueprint('reader', __name__)
 
 # Helper functions
 def allowed_file(filename: str) -> bool:
     """Check if the file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def open_upload(file) -> Tuple[str, object]:
+    """
+    Hash an uploaded file without copying it.
+
+    Returns ``(book_id, source)``, where ``source`` is the in-memory
+    ``BytesIO`` for small uploads or the path of the spooled temp file.
+    """
+    state = get_state()
+    stream = file.stream
+    if isinstance(stream, io.BytesIO):
+        size = stream.getbuffer().nbytes
+        book_id = hashlib.sha256(stream.getbuffer()).hexdigest()
+        source = stream
+        where = 'in_memory'
+    else:
+        digest = hashlib.sha256()
+        size = 0
+        stream.seek(0)
+        while True:
+            chunk = stream.read(current_app.config['UPLOAD_CHUNK_SIZE'])
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+        stream.flush()
+        book_id = digest.hexdigest()
+        source = stream.name
+        where = 'spooled'
+    # Uploads are handled on concurrent threads
+    with state.upload_stats_lock:
+        upload_stats = state.upload_stats
+        upload_stats[where] += 1
+        upload_stats[f'bytes_{where}'] += size
+        upload_stats['max_bytes'] = max(upload_stats['max_bytes'], size)
+    state.metrics.upload_bytes.observe(size)
+    stream.seek(0)
+    return book_id, source
 
-# Rate limiting
-request_history: List[float] = []
+def record_ttft(seconds: float) -> None:
+    get_state().ttft_samples.append(seconds)
+    logger.info(f"Summary stream time to first token: {seconds * 1000:.0f}ms")
+
+def latency_stats(samples) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+    return {'count': len(ordered), 'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95), 'max_ms': percentile(1.0)}
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 def rate_limit(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        now = time.time()
-        request_history[:] = [t for t in request_history if now - t < app.config['RATE_LIMIT']['window']]
-        if len(request_history) >= app.config['RATE_LIMIT']['requests']:
-            abort(429, description="Too many requests")
-        request_history.append(now)
+        # remote_addr is the client address resolved by ProxyFix
+        state = get_state()
+        result = state.rate_limiter.hit(request.remote_addr or 'unknown')
+        g.rate_limit = result
+        state.metrics.rate_limit_checks.inc(result='allowed' if result.allowed else 'rejected')
+        if not result.allowed:
+            raise TooManyRequests(description="Too many requests", retry_after=math.ceil(result.retry_after))
         return f(*args, **kwargs)
     return decorated_function
 
-@app.after_request
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'SAMEORIGIN',
+    'X-XSS-Protection': '1; mode=block',
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+    'Content-Security-Policy': "default-src * 'unsafe-inline' 'unsafe-eval'; img-src * data:",
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+}
+
+def rate_limit_headers(result) -> Dict[str, str]:
+    """Describe a rate limit check as response headers."""
+    return {
+        'X-RateLimit-Limit': str(result.limit),
+        'X-RateLimit-Remaining': str(result.remaining),
+        'X-RateLimit-Reset': str(math.ceil(result.reset_after)),
+    }
+
+@bp.before_app_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+# Registered first so it runs after the other after_request hooks and can time them
+@bp.after_app_request
+def add_server_timing(response):
+    """Report the phases timed during the request, and its total, in a ``Server-Timing`` header."""
+    timings = list(g.get('timings', ()))
+    start = g.get('request_start')
+    if start is not None:
+        timings.append(('total', time.perf_counter() - start))
+    if timings:
+        response.headers['Server-Timing'] = server_timing(timings)
+    return response
+
+@bp.after_app_request
 def add_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    response.headers['Content-Security-Policy'] = "default-src * 'unsafe-inline' 'unsafe-eval'; img-src * data:"
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers.update(SECURITY_HEADERS)
+    
+    result = g.get('rate_limit')
+    if result is not None:
+        response.headers.update(rate_limit_headers(result))
+    return response
+
+@bp.after_app_request
+def compress_response(response):
+    """Compress buffered text responses for clients that accept gzip or brotli."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    settings = current_app.config['COMPRESSION']
+    data = response.get_data()
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None or len(data) < settings['min_bytes']:
+        return response
+    
+    with timed('compress'):
+        response.set_data(compress(data, encoding, settings))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ, so only a weak validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
     return response
 
-def extract_chapters_epub(file_path: str) -> List[Dict[str, str]]:
-    """Extract chapters from an EPUB file."""
+def revalidated_json(payload: Dict) -> Response:
+    """
+    JSON response with a weak ETag that clients must revalidate before reuse.
+
+    Answers 304 Not Modified when the request's If-None-Match matches.
+    """
+    response = jsonify(payload)
+    response.add_etag(weak=True)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# A path on disk or a seekable binary file object holding the upload
+BookSource = Union[str, BinaryIO]
+
+def asset_url(book_id: str, href: str) -> str:
+    return f'/books/{book_id}/assets/{quote(href)}'
+
+def extract_chapters_epub(source: BookSource, book_id: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """
+    Extract chapters from an EPUB file, yielding each one as it is decoded.
+
+    Only the XHTML documents listed in the spine are read, one archive
+    member at a time and in reading order, within the
+    ``EPUB_MAX_UNCOMPRESSED_BYTES`` and ``EPUB_MAX_MEMBERS`` limits. Given
+    a ``book_id``, links to images and stylesheets point at the asset
+    endpoint of that book.
+    """
     try:
-        book = epub.read_epub(file_path)
-        chapters = []
-        
-        for item in book.get_items():
-            if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                try:
-                    content = item.get_content().decode('utf-8')
-                    chapters.append({
-                        'title': item.get_name(),
-                        'content': content
-                    })
-                except UnicodeDecodeError as e:
-                    logger.warning(f"Error decoding chapter content: {e}")
-                    continue
-        
-        return chapters
+        documents = iter_epub_documents(
+            source,
+            max_bytes=current_app.config['EPUB_MAX_UNCOMPRESSED_BYTES'],
+            max_members=current_app.config['EPUB_MAX_MEMBERS'],
+            asset_url=(lambda href: asset_url(book_id, href)) if book_id else None
+        )
+        for name, content in documents:
+            yield {
+                'title': name,
+                'content': content
+            }
+    except EpubLimitError as e:
+        logger.warning(f"Rejected EPUB file: {e}")
+        raise ValueError(str(e))
     except Exception as e:
         logger.warning(f"Error processing EPUB file: {e}")
         raise ValueError("Failed to process EPUB file")
 
-def extract_chapters_pdf(file_path: str) -> List[Dict[str, str]]:
-    """Extract pages from a PDF file."""
+@contextmanager
+def spilled_to_disk(source: BookSource) -> Iterator[str]:
+    """Yield a path to ``source``, writing an in-memory file to the upload folder until the block exits."""
+    if isinstance(source, str):
+        yield source
+        return
+    folder = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=folder, prefix='spill-', suffix='.pdf') as spill:
+        source.seek(0)
+        shutil.copyfileobj(source, spill)
+        spill.flush()
+        yield spill.name
+
+def extract_chapters_pdf(source: BookSource, workers: Optional[int] = None) -> Iterator[Dict[str, str]]:
+    """
+    Extract pages from a PDF file, yielding each one as it is extracted.
+
+    Large PDFs are split into page ranges that are extracted on a pool of
+    ``workers`` processes (``PDF_EXTRACT_WORKERS`` by default); pages keep
+    their original order either way. Workers open ``source`` by path; an
+    in-memory file is first written to one temporary file for them.
+
+    Each page's extraction time is measured where it was extracted and
+    recorded here, as waiting on the pool says little about one page.
+    """
+    from pypdf import PdfReader
+    from pdf_extract import extract_pages, extract_pages_parallel
+    
+    if workers is None:
+        workers = current_app.config['PDF_EXTRACT_WORKERS']
+    metrics = get_state().metrics
+    
     try:
-        reader = PdfReader(file_path)
-        chapters = []
+        reader = PdfReader(source)
+        page_count = len(reader.pages)
         
-        for i in range(len(reader.pages)):
-            try:
-                content = reader.pages[i].extract_text()
-                if content.strip():  # Only include non-empty pages
-                    chapters.append({
-                        'title': f'Page {i + 1}',
-                        'content': content
-                    })
-            except Exception as e:
-                logger.warning(f"Error extracting text from page {i + 1}: {e}")
-                continue
-        
-        return chapters
+        if workers > 1 and page_count >= current_app.config['PDF_PARALLEL_MIN_PAGES']:
+            with spilled_to_disk(source) as path:
+                for i, content, seconds in extract_pages_parallel(path, page_count, workers):
+                    metrics.extract_unit_seconds.observe(seconds, format='pdf')
+                    yield {'title': f'Page {i + 1}', 'content': content}
+        else:
+            for i, content, seconds in extract_pages(reader, 0, page_count):
+                metrics.extract_unit_seconds.observe(seconds, format='pdf')
+                yield {'title': f'Page {i + 1}', 'content': content}
     except Exception as e:
         logger.warning(f"Error processing PDF file: {e}")
         raise ValueError("Failed to process PDF file")
 
-def get_chapter_summary(content: str) -> str:
-    """Generate a summary of the chapter content using OpenAI's API."""
+def extract_assets_epub(source: BookSource) -> Iterator[Tuple[str, str, bytes]]:
+    """Yield the images, fonts and stylesheets of an EPUB file, one at a time."""
+    try:
+        yield from iter_epub_assets(
+            source,
+            max_bytes=current_app.config['EPUB_MAX_ASSET_BYTES'],
+            max_members=current_app.config['EPUB_MAX_MEMBERS']
+        )
+    except EpubLimitError as e:
+        logger.warning(f"Rejected EPUB file: {e}")
+        raise ValueError(str(e))
+    except Exception as e:
+        logger.warning(f"Error processing EPUB assets: {e}")
+        raise ValueError("Failed to process EPUB file")
+
+def measure_extraction(fmt: str, chapters: Iterator[Dict[str, str]], per_unit: bool = True) -> Iterator[Dict[str, str]]:
+    """
+    Pass chapters through, observing the time spent producing each one and
+    the whole book. Time the caller spends between chapters is not counted.
+    Extractors that time their own units pass ``per_unit=False``.
+    """
+    metrics = get_state().metrics
+    total = 0.0
+    while True:
+        start = time.perf_counter()
+        chapter = next(chapters, None)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        if chapter is None:
+            break
+        if per_unit:
+            metrics.extract_unit_seconds.observe(elapsed, format=fmt)
+        yield chapter
+    metrics.extract_book_seconds.observe(total, format=fmt)
+    record_timing('extract', total)
+
+def extract_chapters(filename: str, source: BookSource, book_id: str) -> Iterator[Dict[str, str]]:
+    """Pick the extractor for an upload by its file extension."""
+    if filename.endswith('.epub'):
+        return measure_extraction('epub', extract_chapters_epub(source, book_id))
+    return measure_extraction('pdf', extract_chapters_pdf(source), per_unit=False)
+
+def store_book(book_id: str, filename: str, source: BookSource, chapters: List[Dict[str, str]]) -> None:
+    """Store extracted chapters and their search index, together with the assets of EPUB files."""
+    with timed('index'):
+        index = SearchIndex.build(chapters).to_members()
+    with timed('store'):
+        assets = extract_assets_epub(source) if filename.endswith('.epub') else ()
+        get_state().book_store.put(book_id, chapters, assets, index=index)
+
+def load_search_index(book_id: str) -> Optional[SearchIndex]:
+    """Return the search index of a stored book, decoding it at most once while it stays cached."""
+    state = get_state()
+    search_indexes = state.search_indexes
+    with state.search_indexes_lock:
+        if book_id in search_indexes:
+            search_indexes.move_to_end(book_id)
+            state.search_index_stats['hits'] += 1
+            return search_indexes[book_id]
+        state.search_index_stats['misses'] += 1
+    
+    members = state.book_store.get_index(book_id)
+    if members is None:
+        return None
+    index = SearchIndex.from_members(members)
+    
+    with state.search_indexes_lock:
+        search_indexes[book_id] = index
+        while len(search_indexes) > current_app.config['SEARCH']['cached_indexes']:
+            search_indexes.popitem(last=False)
+    return index
+
+def validate_summary_content(content: str) -> None:
+    """Reject content that is too short to produce a meaningful summary."""
     if not content or len(content.strip()) < 10:
         raise ValueError("Content is too short to summarize")
+
+SUMMARY_INSTRUCTION = "Please provide a brief summary of the following chapter content"
+MAP_INSTRUCTION = "Please provide a brief summary of the following part ({part} of {total}) of a book chapter"
+REDUCE_INSTRUCTION = (
+    "The following are summaries of consecutive parts of one book chapter. "
+    "Please combine them into a single brief summary of the whole chapter"
+)
+MAX_REDUCE_LEVELS = 3
+
+def summary_request(content: str, instruction: str = SUMMARY_INSTRUCTION) -> Dict:
+    """Build the chat completion arguments for summarizing ``content``."""
+    settings = current_app.config['SUMMARY']
+    excerpt = content[:settings['max_input_chars']]
+    return dict(
+        model=settings['model'],
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that summarizes book chapters."},
+            {"role": "user", "content": f"{instruction}: {excerpt}"}
+        ],
+        max_tokens=settings['max_tokens'],
+        temperature=settings['temperature'],
+        presence_penalty=0.0,
+        frequency_penalty=0.0
+    )
+
+def resolve_summary_strategy(content: str, strategy: Optional[str] = None) -> str:
+    """Resolve the requested strategy to 'truncate' or 'map_reduce' for this content."""
+    strategy = strategy or current_app.config['SUMMARY']['strategy']
+    if strategy not in SUMMARY_STRATEGIES:
+        raise ValueError(f"Unknown summary strategy. Use one of: {', '.join(SUMMARY_STRATEGIES)}")
+    # Content that fits in a single request gains nothing from map-reduce
+    if len(content) <= current_app.config['SUMMARY']['max_input_chars']:
+        return 'truncate'
+    return 'truncate' if strategy == 'truncate' else 'map_reduce'
+
+@contextmanager
+def observe_openai(mode: str) -> Iterator[None]:
+    """Observe the latency of one chat completion request, labelled by whether it succeeded."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - start
+        get_state().metrics.openai_seconds.observe(elapsed, mode=mode, outcome=outcome)
+        record_timing('openai', elapsed)
+
+def record_token_usage(usage) -> None:
+    """Observe the token counts reported with a completion; streamed responses carry none."""
+    if usage is not None:
+        openai_tokens = get_state().metrics.openai_tokens
+        openai_tokens.observe(usage.prompt_tokens, kind='prompt')
+        openai_tokens.observe(usage.completion_tokens, kind='completion')
+
+def is_transient_openai_error(error: Exception) -> bool:
+    """Whether a failed request may succeed if retried: timeouts, connection errors, 408/409/429 and 5xx."""
+    import openai
     
+    if isinstance(error, openai.APIConnectionError):  # Includes timeouts
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code in (408, 409, 429) or error.status_code >= 500)
+
+def openai_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait in a Retry-After header, if any."""
+    response = getattr(error, 'response', None)
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes book chapters."},
-                {"role": "user", "content": f"Please provide a brief summary of the following chapter content: {content[:4000]}"}
-            ],
-            max_tokens=500,
-            temperature=0.7,
-            presence_penalty=0.0,
-            frequency_penalty=0.0
+        return float(response.headers['retry-after'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+@contextmanager
+def guard_openai_call() -> Iterator[None]:
+    """Fail fast if the circuit is open, otherwise report the call's outcome to the circuit breaker."""
+    openai_breaker = get_state().openai_breaker
+    openai_breaker.before_call()
+    try:
+        yield
+    except DeadlineExceededError:
+        # Given up before the request was sent, which says nothing about the API
+        openai_breaker.cancel_call()
+        raise
+    except Exception as e:
+        if is_transient_openai_error(e):
+            openai_breaker.record_failure()
+        else:
+            # The API answered, so it is up even if it refused this request
+            openai_breaker.record_success()
+        raise
+    except BaseException:
+        # A cancelled or interrupted call still holds the half-open trial
+        # slot; counting it as a failure frees the slot instead of leaving
+        # the circuit rejecting every call forever
+        openai_breaker.record_failure()
+        raise
+    openai_breaker.record_success()
+
+def summary_deadline(fallback: bool) -> Optional[float]:
+    """The ``time.monotonic()`` by which a summary that can fall back gives up on the model, or None."""
+    fallback_after = current_app.config['SUMMARY']['fallback_after']
+    return time.monotonic() + fallback_after if fallback and fallback_after > 0 else None
+
+def deadline_options(deadline: Optional[float]) -> Dict:
+    """
+    Request options that cut the client's timeouts short to the time left
+    before ``deadline``. Raises ``DeadlineExceededError`` once it has passed.
+    """
+    if deadline is None:
+        return {}
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError('Summary service did not answer in time')
+    import openai
+    
+    timeouts = current_app.config['OPENAI_TIMEOUT']
+    return {'timeout': openai.Timeout(min(timeouts['read'], remaining), connect=min(timeouts['connect'], remaining))}
+
+def create_completion(deadline: Optional[float] = None, **kwargs):
+    """
+    Call the chat completions API once the shared request budget allows it.
+
+    Transient failures are retried with jittered exponential backoff; each
+    attempt draws from the budget and is checked by the circuit breaker.
+    With a ``deadline`` (a ``time.monotonic()`` value), waits, timeouts and
+    retries are cut short so the call gives up by then. Raises
+    ``UpstreamUnavailableError`` if the circuit is open, the deadline
+    passed or the last attempt failed transiently.
+    """
+    state = get_state()
+    mode = 'stream' if kwargs.get('stream') else 'complete'
+    
+    def attempt():
+        with guard_openai_call():
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not state.openai_budget.acquire(timeout=timeout):
+                raise DeadlineExceededError('Summary service did not answer in time')
+            options = deadline_options(deadline)
+            with observe_openai(mode):
+                response = state.client.chat.completions.create(**kwargs, **options)
+        record_token_usage(getattr(response, 'usage', None))
+        return response
+    
+    try:
+        return call_with_retries(
+            attempt,
+            is_transient_openai_error,
+            retry_after=openai_retry_after,
+            on_retry=lambda e: state.metrics.openai_retries.inc(),
+            deadline=deadline,
+            **current_app.config['OPENAI_RETRY']
         )
-        return response.choices[0].message.content
+    except Exception as e:
+        if is_transient_openai_error(e):
+            raise UpstreamUnavailableError('Summary service is temporarily unavailable') from e
+        raise
+
+def complete_summary(content: str, instruction: str = SUMMARY_INSTRUCTION, deadline: Optional[float] = None) -> str:
+    response = create_completion(deadline, **summary_request(content, instruction))
+    return response.choices[0].message.content
+
+def summarize_chunks(chunks: List[str], deadline: Optional[float] = None) -> List[str]:
+    """Summarize chunks concurrently, with at most ``max_concurrency`` requests in flight."""
+    workers = max(1, min(current_app.config['SUMMARY']['max_concurrency'], len(chunks)))
+    instructions = [MAP_INSTRUCTION.format(part=i + 1, total=len(chunks)) for i in range(len(chunks))]
+    app = current_app._get_current_object()
+    
+    def summarize_chunk(chunk: str, instruction: str) -> str:
+        with app.app_context():
+            return complete_summary(chunk, instruction, deadline)
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(summarize_chunk, chunks, instructions))
+
+def map_chapter(content: str, deadline: Optional[float] = None) -> str:
+    """
+    Run the map phase of a map-reduce summary.
+
+    Returns the partial summaries joined together, collapsed with further
+    rounds of chunked summaries until they fit in a single reduce request.
+    """
+    chunk_tokens = current_app.config['SUMMARY']['chunk_tokens']
+    combined = '\n\n'.join(summarize_chunks(split_into_chunks(content, chunk_tokens), deadline))
+    for _ in range(MAX_REDUCE_LEVELS):
+        if estimate_tokens(combined) <= chunk_tokens:
+            break
+        combined = '\n\n'.join(summarize_chunks(split_into_chunks(combined, chunk_tokens), deadline))
+    return reduce_input(combined)
+
+def reduce_input(combined: str) -> str:
+    """Return the combined partial summaries, logging if the reduce request will have to cut them short."""
+    max_input_chars = current_app.config['SUMMARY']['max_input_chars']
+    if len(combined) > max_input_chars:
+        logger.warning(f"Partial summaries still take {len(combined)} characters after {MAX_REDUCE_LEVELS} "
+                       f"reduce rounds; the final summary only sees the first {max_input_chars}")
+    return combined
+
+def check_summary_settings(settings: Dict) -> None:
+    """Reject a chunk size that ``summary_request`` would truncate, losing the end of every chunk."""
+    if settings['chunk_tokens'] * CHARS_PER_TOKEN > settings['max_input_chars']:
+        raise ValueError(f"SUMMARY chunk_tokens ({settings['chunk_tokens']}) must fit in max_input_chars "
+                         f"({settings['max_input_chars']}) at {CHARS_PER_TOKEN} characters per token")
+
+def resolve_summary_mode(mode: Optional[str] = None) -> str:
+    mode = mode or current_app.config['SUMMARY']['mode']
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summary mode. Use one of: {', '.join(SUMMARY_MODES)}")
+    return mode
+
+def extractive_chapter_summary(content: str) -> str:
+    """Summarize the whole chapter locally by picking its most central sentences."""
+    import extractive_summary
+    
+    with timed('extractive'):
+        return extractive_summary.summarize(content, current_app.config['SUMMARY']['extractive_sentences'])
+
+def fallback_summary(content: str) -> Tuple[str, str]:
+    get_state().metrics.summary_fallbacks.inc()
+    return extractive_chapter_summary(content), 'extractive'
+
+def get_chapter_summary(content: str, strategy: str = 'truncate', fallback: Optional[bool] = None) -> Tuple[str, str]:
+    """
+    Generate a summary of the chapter content using OpenAI's API.
+
+    Returns ``(summary, engine)``. If the model call fails and ``fallback``
+    (``SUMMARY['fallback']`` by default) is set, the extractive summary is
+    returned instead, with engine ``'extractive'``. Such calls give up on
+    the model after ``SUMMARY['fallback_after']`` seconds.
+    """
+    validate_summary_content(content)
+    if fallback is None:
+        fallback = current_app.config['SUMMARY']['fallback']
+    deadline = summary_deadline(fallback)
+    
+    try:
+        if strategy == 'map_reduce':
+            return complete_summary(map_chapter(content, deadline), REDUCE_INSTRUCTION, deadline), 'remote'
+        return complete_summary(content, deadline=deadline), 'remote'
+    except UpstreamUnavailableError as e:
+        logger.warning(f"Summary service unavailable: {e.__cause__ or e}")
+        if fallback:
+            return fallback_summary(content)
+        raise
     except Exception as e:
         logger.warning(f"Error generating summary: {e}")
+        if fallback:
+            return fallback_summary(content)
         raise ValueError("Failed to generate summary")
 
-@app.route('/')
+def stream_chapter_summary(content: str, strategy: str = 'truncate', deadline: Optional[float] = None) -> Iterator[str]:
+    """
+    Yield summary text fragments as the model produces them.
+
+    For map-reduce summaries the partial summaries are generated first and
+    only the final reduce step is streamed. ``deadline`` bounds the wait
+    for the stream to start, as in ``create_completion``.
+    """
+    validate_summary_content(content)
+    
+    try:
+        if strategy == 'map_reduce':
+            request_args = summary_request(map_chapter(content, deadline), REDUCE_INSTRUCTION)
+        else:
+            request_args = summary_request(content)
+        stream = create_completion(deadline, **request_args, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except UpstreamUnavailableError as e:
+        logger.warning(f"Summary service unavailable: {e.__cause__ or e}")
+        raise ValueError(str(e))
+    except Exception as e:
+        logger.warning(f"Error streaming summary: {e}")
+        raise ValueError("Failed to generate summary")
+
+def summary_cache_key(content: str, strategy: str = 'truncate') -> str:
+    """Build the summary cache key for the content as it would be sent to the model."""
+    settings = current_app.config['SUMMARY']
+    if strategy == 'truncate':
+        content = content[:settings['max_input_chars']]
+    return make_summary_key(
+        content,
+        settings['model'],
+        settings['max_tokens'],
+        settings['temperature'],
+        strategy
+    )
+
+def get_cached_summary(content: str, strategy: Optional[str] = None, mode: Optional[str] = None,
+                       fallback: Optional[bool] = None) -> Tuple[str, bool, str]:
+    """
+    Return ``(summary, cached, engine)``, generating and caching the summary on a miss.
+
+    Concurrent misses for the same key share one generation; the callers
+    that waited for it get ``cached`` True, since they caused no model call.
+    Extractive summaries are computed on every request and never cached.
+    """
+    if resolve_summary_mode(mode) == 'extractive':
+        validate_summary_content(content)
+        return extractive_chapter_summary(content), False, 'extractive'
+    
+    strategy = resolve_summary_strategy(content, strategy)
+    key = summary_cache_key(content, strategy)
+    summary_cache = get_state().summary_cache
+    with timed('cache'):
+        summary = summary_cache.get(key)
+    if summary is not None:
+        return summary, True, 'remote'
+    
+    def generate() -> Tuple[str, str]:
+        summary, engine = get_chapter_summary(content, strategy, fallback)
+        # A fallback summary only stands in until the model is reachable again
+        if engine == 'remote':
+            summary_cache.set(key, summary)
+        return summary, engine
+    
+    (summary, engine), shared = get_state().summary_flights.do(key, generate)
+    return summary, shared, engine
+
+def unavailable_response(error: UpstreamUnavailableError):
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+    return response
+
+@bp.route('/')
 @rate_limit
 def index():
     """Render the main page."""
     return render_template('index.html')
 
-@app.route('/upload', methods=['POST'])
+def ndjson_line(data: Dict) -> str:
+    """Format one line of a newline-delimited JSON response."""
+    return json.dumps(data) + '\n'
+
+def detach_upload(file) -> BinaryIO:
+    """
+    Take ownership of an upload's stream.
+
+    The request closes its files when the view returns, before a streamed
+    response body is generated; the caller must close the returned stream.
+    """
+    stream = file.stream
+    file.stream = io.BytesIO()
+    return stream
+
+def stream_upload(upload: BinaryIO, filename: str, book_id: str, source: BookSource) -> Iterator[str]:
+    """
+    Yield a streaming upload response as NDJSON.
+
+    A ``book`` line comes first, then one ``chapter`` line (title and size)
+    per chapter as soon as it is extracted, then ``done`` once the book has
+    been stored and every chapter can be fetched. The first chapter line
+    also carries its content so the reader can show it straight away.
+    Failures end the stream with an ``error`` line. ``upload`` is closed
+    once the stream ends.
+    """
+    book_store = get_state().book_store
+    try:
+        yield ndjson_line({'type': 'book', 'book_id': book_id})
+        
+        toc = book_store.get_toc(book_id)
+        if toc is not None:
+            for index, entry in enumerate(toc):
+                line = {'type': 'chapter', 'index': index, 'title': entry['title'], 'size': entry['size']}
+                if index == 0:
+                    line['content'] = book_store.get_chapter(book_id, 0)['content']
+                yield ndjson_line(line)
+            yield ndjson_line({'type': 'done', 'book_id': book_id, 'chapters': len(toc)})
+            return
+        
+        chapters = []
+        for chapter in extract_chapters(filename, source, book_id):
+            line = {'type': 'chapter', 'index': len(chapters), 'title': chapter['title'], 'size': len(chapter['content'])}
+            if not chapters:
+                line['content'] = chapter['content']
+            chapters.append(chapter)
+            yield ndjson_line(line)
+        
+        if not chapters:
+            yield ndjson_line({'type': 'error', 'error': 'No content found in file'})
+            return
+        
+        store_book(book_id, filename, source, chapters)
+        yield ndjson_line({'type': 'done', 'book_id': book_id, 'chapters': len(chapters)})
+    except ValueError as e:
+        yield ndjson_line({'type': 'error', 'error': str(e)})
+    except Exception as e:
+        logger.warning(f"Error processing file: {e}")
+        yield ndjson_line({'type': 'error', 'error': 'Internal server error'})
+    finally:
+        upload.close()
+
+@bp.route('/upload', methods=['POST'])
 @rate_limit
 def upload_file():
-    """Handle file upload and chapter extraction."""
-    if 'file' not in request.files:
+    """
+    Handle file upload and chapter extraction.
+
+    With ``?stream=1`` the response is NDJSON that lists chapters while the
+    book is still being parsed; see ``stream_upload``.
+    """
+    with timed('receive'):
+        # Parsing the form reads the body into memory or the spool file
+        files = request.files
+    if 'file' not in files:
         return jsonify({'error': 'No file provided'}), 400
     
-    file = request.files['file']
+    file = files['file']
     if not file or file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
@@ -165,25 +1089,32 @@ def upload_file():
     
     try:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
-        # Save file securely
-        file.save(filepath)
+        # Small uploads are parsed from memory, larger ones from their spool file
+        with timed('hash'):
+            book_id, source = open_upload(file)
+        
+        if request.args.get('stream') == '1':
+            return Response(
+                stream_with_context(stream_upload(detach_upload(file), filename, book_id, source)),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
         try:
-            # Process file based on type
-            if filename.endswith('.epub'):
-                chapters = extract_chapters_epub(filepath)
-            else:
-                chapters = extract_chapters_pdf(filepath)
-            
-            # Clean up the uploaded file
-            os.remove(filepath)
-            
-            if not chapters:
-                return jsonify({'error': 'No content found in file'}), 400
+            # Skip parsing entirely for books we have already extracted
+            toc = get_state().book_store.get_toc(book_id)
+            if toc is None:
+                chapters = list(extract_chapters(filename, source, book_id))
+                
+                if not chapters:
+                    return jsonify({'error': 'No content found in file'}), 400
+                
+                store_book(book_id, filename, source, chapters)
+                toc = [{'title': chapter['title'], 'size': len(chapter['content'])} for chapter in chapters]
             
-            return jsonify({'chapters': chapters})
+            # Chapter bodies are served on demand from /books/<book_id>/chapters/<n>
+            return jsonify({'book_id': book_id, 'chapters': toc})
             
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -191,15 +1122,117 @@ def upload_file():
             logger.warning(f"Error processing file: {e}")
             return jsonify({'error': 'Internal server error'}), 500
         finally:
-            # Ensure file is cleaned up even if processing fails
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            # Release the upload now rather than when the request ends
+            file.close()
                 
     except Exception as e:
         logger.warning(f"Error handling file upload: {e}")
         return jsonify({'error': 'Failed to process upload'}), 500
 
-@app.route('/summarize', methods=['POST'])
+@bp.route('/books/<book_id>', methods=['GET'])
+@rate_limit
+def get_book(book_id: str):
+    """Return the table of contents of a previously uploaded book."""
+    toc = get_state().book_store.get_toc(book_id) if is_valid_book_id(book_id) else None
+    if toc is None:
+        return jsonify({'error': 'Book not found'}), 404
+    return revalidated_json({'book_id': book_id, 'chapters': toc})
+
+# Not rate limited: the reader fetches (and prefetches) a chapter per page
+# turn, so limiting it would cap reading at a few dozen pages an hour
+@bp.route('/books/<book_id>/chapters/<int:index>', methods=['GET'])
+def get_chapter(book_id: str, index: int):
+    """Return the content of a single chapter."""
+    chapter = get_state().book_store.get_chapter(book_id, index) if is_valid_book_id(book_id) else None
+    if chapter is None:
+        return jsonify({'error': 'Chapter not found'}), 404
+    return revalidated_json({'index': index, 'title': chapter['title'], 'content': chapter['content']})
+
+@bp.route('/books/<book_id>/search', methods=['GET'])
+@rate_limit
+def search_book(book_id: str):
+    """Return chapters matching ``q``, best first, with word positions and a snippet of the first match."""
+    settings = current_app.config['SEARCH']
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    if len(query) > settings['max_query_chars']:
+        return jsonify({'error': f"Query is too long (max {settings['max_query_chars']} characters)"}), 400
+    
+    index = load_search_index(book_id) if is_valid_book_id(book_id) else None
+    if index is None:
+        return jsonify({'error': 'Book not found'}), 404
+    
+    hits = index.search(query, settings['max_results'])
+    for hit in hits:
+        chapter = get_state().book_store.get_chapter(book_id, hit['index'])
+        text = html_to_text(chapter['content'])
+        offsets = [offset for _, offset in tokenize(text)]
+        hit['title'] = chapter['title']
+        hit['snippet'] = make_snippet(text, offsets[hit['positions'][0]]) if hit['positions'] else ''
+    return revalidated_json({'query': query, 'hits': hits})
+
+# Not rate limited: a chapter can reference dozens of assets, and the
+# responses are cacheable by the browser and nginx
+@bp.route('/books/<book_id>/assets/<path:href>', methods=['GET'])
+def get_asset(book_id: str, href: str):
+    """Serve an image, font or stylesheet of a stored EPUB, with Range and conditional request support."""
+    asset = get_state().book_store.get_asset(book_id, href) if is_valid_book_id(book_id) else None
+    if asset is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    info, data = asset
+    response = send_file(
+        io.BytesIO(data),
+        mimetype=info['media_type'],
+        etag=info['etag'],
+        max_age=current_app.config['ASSET_MAX_AGE'],
+        conditional=True
+    )
+    response.cache_control.immutable = True
+    return response
+
+# Not rate limited: the reader looks this up alongside every chapter it
+# loads or prefetches, and it only reads the summary cache
+@bp.route('/books/<book_id>/chapters/<int:index>/summary', methods=['GET'])
+def get_chapter_summary_if_cached(book_id: str, index: int):
+    """Return a chapter's summary if one has already been generated, without calling the model."""
+    chapter = get_state().book_store.get_chapter(book_id, index) if is_valid_book_id(book_id) else None
+    if chapter is None:
+        return jsonify({'error': 'Chapter not found'}), 404
+    content = chapter['content']
+    summary = get_state().summary_cache.get(summary_cache_key(content, resolve_summary_strategy(content, 'auto')))
+    if summary is None:
+        return jsonify({'error': 'Summary not generated yet'}), 404
+    return revalidated_json({'index': index, 'summary': summary, 'cached': True, 'engine': 'remote'})
+
+@bp.route('/books/<book_id>/summaries', methods=['POST'])
+@rate_limit
+def summarize_book(book_id: str):
+    """Queue a background job that summarizes every chapter of a book."""
+    toc = get_state().book_store.get_toc(book_id) if is_valid_book_id(book_id) else None
+    if toc is None:
+        return jsonify({'error': 'Book not found'}), 404
+    
+    state = get_state()
+    
+    def load_chapter(index: int) -> Optional[str]:
+        chapter = state.book_store.get_chapter(book_id, index)
+        return chapter['content'] if chapter else None
+    
+    job = state.summary_jobs.submit(book_id, len(toc), load_chapter)
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+# Not rate limited: the page polls job progress until the job finishes, and
+# a lookup is a dictionary read
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """Report progress and results of a background summarization job."""
+    job = get_state().summary_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/summarize', methods=['POST'])
 @rate_limit
 def summarize():
     """Generate a summary of the provided content."""
@@ -208,22 +1241,138 @@ def summarize():
         if not content:
             return jsonify({'error': 'No content provided'}), 400
         
-        summary = get_chapter_summary(content)
-        return jsonify({'summary': summary})
+        summary, cached, engine = get_cached_summary(
+            content, request.json.get('strategy'), request.json.get('mode')
+        )
+        return jsonify({'summary': summary, 'cached': cached, 'engine': engine})
         
+    except UpstreamUnavailableError as e:
+        return unavailable_response(e)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.warning(f"Error generating summary: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
-def create_app(testing=False):
-    """Create and configure the Flask application."""
+@bp.route('/summarize/stream', methods=['POST'])
+@rate_limit
+def summarize_stream():
+    """
+    Stream a summary of the provided content as Server-Sent Events.
+
+    Emits ``token`` events carrying text fragments, then a final ``done``
+    event naming the engine, or an ``error`` event if generation fails
+    midway. Extractive summaries, including the fallback when the model
+    fails before its first token, arrive as a single token.
+    """
+    payload = request.get_json(silent=True) or {}
+    content = payload.get('content')
+    if not content:
+        return jsonify({'error': 'No content provided'}), 400
+    try:
+        validate_summary_content(content)
+        mode = resolve_summary_mode(payload.get('mode'))
+        strategy = resolve_summary_strategy(content, payload.get('strategy'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    summary_cache = get_state().summary_cache
+    key = summary_cache_key(content, strategy)
+    cached = summary_cache.get(key) if mode == 'remote' else None
+    fallback = current_app.config['SUMMARY']['fallback']
+    
+    def generate():
+        if mode == 'extractive':
+            yield sse_event('token', {'token': extractive_chapter_summary(content)})
+            yield sse_event('done', {'cached': False, 'engine': 'extractive'})
+            return
+        if cached is not None:
+            yield sse_event('token', {'token': cached})
+            yield sse_event('done', {'cached': True, 'engine': 'remote'})
+            return
+        
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        try:
+            for token in stream_chapter_summary(content, strategy, summary_deadline(fallback)):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    record_ttft(ttft)
+                parts.append(token)
+                yield sse_event('token', {'token': token})
+        except ValueError as e:
+            if fallback and not parts:
+                summary, engine = fallback_summary(content)
+                yield sse_event('token', {'token': summary})
+                yield sse_event('done', {'cached': False, 'engine': engine})
+            else:
+                yield sse_event('error', {'error': str(e)})
+            return
+        
+        if parts:
+            summary_cache.set(key, ''.join(parts))
+        yield sse_event('done', {'cached': False, 'engine': 'remote',
+                                 'ttft_ms': round(ttft * 1000, 1) if ttft is not None else None})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/metrics')
+def metrics():
+    """Expose counters and histograms in the Prometheus text format."""
+    return Response(get_state().metrics.registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@bp.route('/stats')
+def stats():
+    """Report cache counters."""
+    state = get_state()
+    with state.upload_stats_lock:
+        upload_stats = dict(state.upload_stats)
+    return jsonify({
+        'book_cache': state.book_store.stats(),
+        'uploads': upload_stats,
+        'summary_cache': state.summary_cache.stats(),
+        'summary_stream': {'ttft': latency_stats(state.ttft_samples)},
+        'openai_budget': {'per_minute': state.openai_budget.per_minute,
+                          'waited_seconds': round(state.openai_budget.waited, 3)},
+    })
+
+def create_app(config: Optional[Dict] = None, testing: bool = False) -> Flask:
+    """
+    Create and configure a Flask application.
+
+    Settings are read from the environment, then overridden by ``config``.
+    The OpenAI client, caches and parsers are set up on first use, so apps
+    are cheap to create and start without ``OPENAI_API_KEY``; only remote
+    summaries need it.
+    """
+    app = Flask(__name__)
+    app.config.update(load_config())
+    if config:
+        app.config.update(config)
     if testing:
         app.config['TESTING'] = True
         app.config['DEBUG'] = False
+    if not app.config['OPENAI_API_KEY']:
+        logger.warning("OPENAI_API_KEY is not set; remote summaries will fail")
+    check_summary_settings(app.config['SUMMARY'])
+    
+    app.request_class = UploadRequest
+    app.json = TimedJSONProvider(app)
+    CORS(app, resources={r"/*": {"origins": "*"}})  # Allow all origins for testing
+    # x_for=1 trusts the X-Forwarded-For header set by the nginx proxy for per-client rate limits
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
+    app.extensions['book_reader'] = ReaderState(app)
+    app.register_blueprint(bp)
     return app
 
+# The app served by `python app.py`, `flask run` and asgi.py
+app = create_app()
+
 # Constants with security documentation
 LOCALHOST = '127.0.0.1'
 ALL_INTERFACES = '0.0.0.0'  # nosec B104 # Required for external access, protected by explicit configuration and security measures
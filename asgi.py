@@ -0,0 +1,414 @@
+"""
+ASGI entry point for the book reader.
+
+``POST /summarize`` and ``POST /summarize/stream`` are served natively on
+the event loop with ``openai.AsyncOpenAI``, so a request waiting on the
+model holds no thread and one process can keep hundreds of summaries in
+flight. Every other route is passed to the Flask app through a WSGI
+adapter.
+
+Run with:
+    uvicorn asgi:application --host 127.0.0.1 --port 50869
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as reader
+from compression import choose_encoding, compress
+from metrics import server_timing
+from resilience import DeadlineExceededError, UpstreamUnavailableError, call_with_retries_async
+
+if TYPE_CHECKING:
+    import openai  # Imported on first use in get_async_client
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict
+Receive = Callable[[], Awaitable[Dict]]
+Send = Callable[[Dict], Awaitable[None]]
+
+wsgi_application = WsgiToAsgi(reader.app)
+
+# One client per process: its connection pool is shared by all requests
+async_client: Optional['openai.AsyncOpenAI'] = None
+
+
+def get_async_client() -> 'openai.AsyncOpenAI':
+    global async_client
+    if async_client is None:
+        import openai
+
+        config = reader.app.config
+        if not config['OPENAI_API_KEY']:
+            raise ValueError('OPENAI_API_KEY is not configured')
+        timeouts = config['OPENAI_TIMEOUT']
+        # Retries are handled by create_completion, so each attempt is budgeted and guarded
+        async_client = openai.AsyncOpenAI(
+            api_key=config['OPENAI_API_KEY'],
+            timeout=openai.Timeout(timeouts['read'], connect=timeouts['connect']),
+            max_retries=0
+        )
+    return async_client
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def request_header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def client_address(scope: Scope) -> str:
+    """Resolve the client IP the same way ProxyFix(x_for=1) does for the Flask routes."""
+    forwarded_for = request_header(scope, b'x-forwarded-for')
+    if forwarded_for:
+        return forwarded_for.split(',')[-1].strip()
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+
+def response_headers(content_type: str, extra: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+    headers = dict(reader.SECURITY_HEADERS, **extra)
+    headers['Content-Type'] = content_type
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+
+
+async def send_json(send: Send, status: int, payload: Dict, headers: Dict[str, str],
+                    accept_encoding: Optional[str] = None) -> None:
+    """Send a JSON response, compressed like the Flask app's when it is large enough."""
+    body = json.dumps(payload).encode('utf-8')
+    extra = dict(headers)
+    if status == 200:
+        settings = reader.app.config['COMPRESSION']
+        encoding = choose_encoding(accept_encoding)
+        extra['Vary'] = 'Accept-Encoding'
+        if encoding is not None and len(body) >= settings['min_bytes']:
+            body = compress(body, encoding, settings)
+            extra['Content-Encoding'] = encoding
+    extra['Content-Length'] = str(len(body))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': response_headers('application/json', extra)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_json(receive: Receive) -> Dict:
+    """Read the request body, enforcing MAX_CONTENT_LENGTH, and decode it as JSON."""
+    limit = reader.app.config['MAX_CONTENT_LENGTH']
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HTTPError(400, 'Client disconnected')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise HTTPError(413, 'Request entity too large')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    try:
+        payload = json.loads(b''.join(chunks) or b'null')
+    except ValueError:
+        raise HTTPError(400, 'Invalid JSON')
+    if not isinstance(payload, dict):
+        raise HTTPError(400, 'No content provided')
+    return payload
+
+
+async def check_rate_limit(scope: Scope) -> Dict[str, str]:
+    """Apply the shared per-client rate limit and return the headers describing it."""
+    state = reader.get_state()
+    result = await asyncio.to_thread(state.rate_limiter.hit, client_address(scope))
+    headers = reader.rate_limit_headers(result)
+    state.metrics.rate_limit_checks.inc(result='allowed' if result.allowed else 'rejected')
+    if not result.allowed:
+        headers['Retry-After'] = str(math.ceil(result.retry_after))
+        raise HTTPError(429, 'Too many requests', headers)
+    return headers
+
+
+async def create_completion(deadline: Optional[float] = None, **kwargs):
+    """
+    Async counterpart of ``app.create_completion``: every attempt, retries
+    included, draws from the shared budget and is checked by the circuit
+    breaker, and ``deadline`` cuts waits, timeouts and retries short.
+    """
+    state = reader.get_state()
+    mode = 'stream' if kwargs.get('stream') else 'complete'
+
+    async def attempt():
+        with reader.guard_openai_call():
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not await state.openai_budget.acquire_async(timeout=timeout):
+                raise DeadlineExceededError('Summary service did not answer in time')
+            options = reader.deadline_options(deadline)
+            with reader.observe_openai(mode):
+                response = await get_async_client().chat.completions.create(**kwargs, **options)
+        reader.record_token_usage(getattr(response, 'usage', None))
+        return response
+
+    try:
+        return await call_with_retries_async(
+            attempt,
+            reader.is_transient_openai_error,
+            retry_after=reader.openai_retry_after,
+            on_retry=lambda e: state.metrics.openai_retries.inc(),
+            deadline=deadline,
+            **reader.app.config['OPENAI_RETRY']
+        )
+    except Exception as e:
+        if reader.is_transient_openai_error(e):
+            raise UpstreamUnavailableError('Summary service is temporarily unavailable') from e
+        raise
+
+
+async def complete_summary(content: str, instruction: str = reader.SUMMARY_INSTRUCTION,
+                           deadline: Optional[float] = None) -> str:
+    response = await create_completion(deadline, **reader.summary_request(content, instruction))
+    return response.choices[0].message.content
+
+
+async def summarize_chunks(chunks: List[str], deadline: Optional[float] = None) -> List[str]:
+    """Summarize chunks concurrently, with at most ``max_concurrency`` requests in flight."""
+    semaphore = asyncio.Semaphore(max(1, reader.app.config['SUMMARY']['max_concurrency']))
+
+    async def summarize_chunk(i: int, chunk: str) -> str:
+        async with semaphore:
+            return await complete_summary(chunk, reader.MAP_INSTRUCTION.format(part=i + 1, total=len(chunks)),
+                                          deadline)
+
+    return list(await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks))))
+
+
+async def map_chapter(content: str, deadline: Optional[float] = None) -> str:
+    """Async counterpart of ``app.map_chapter``."""
+    chunk_tokens = reader.app.config['SUMMARY']['chunk_tokens']
+    combined = '\n\n'.join(await summarize_chunks(reader.split_into_chunks(content, chunk_tokens), deadline))
+    for _ in range(reader.MAX_REDUCE_LEVELS):
+        if reader.estimate_tokens(combined) <= chunk_tokens:
+            break
+        combined = '\n\n'.join(await summarize_chunks(reader.split_into_chunks(combined, chunk_tokens), deadline))
+    return reader.reduce_input(combined)
+
+
+async def get_chapter_summary(content: str, strategy: str = 'truncate') -> Tuple[str, str]:
+    """Async counterpart of ``app.get_chapter_summary``; returns ``(summary, engine)``."""
+    reader.validate_summary_content(content)
+    fallback = reader.app.config['SUMMARY']['fallback']
+    deadline = reader.summary_deadline(fallback)
+    try:
+        if strategy == 'map_reduce':
+            return await complete_summary(await map_chapter(content, deadline), reader.REDUCE_INSTRUCTION,
+                                          deadline), 'remote'
+        return await complete_summary(content, deadline=deadline), 'remote'
+    except Exception as e:
+        unavailable = isinstance(e, UpstreamUnavailableError) or reader.is_transient_openai_error(e)
+        logger.warning(f"{'Summary service unavailable' if unavailable else 'Error generating summary'}: {e}")
+        if fallback:
+            return await asyncio.to_thread(reader.fallback_summary, content)
+        error = summary_error(e)
+        if error is e:
+            raise
+        raise error from e
+
+
+def summary_error(e: Exception) -> Exception:
+    """Map a failed model call to the error the handlers report: unavailable (503) or failed (400)."""
+    if isinstance(e, UpstreamUnavailableError):
+        return e
+    if reader.is_transient_openai_error(e):
+        return UpstreamUnavailableError('Summary service is temporarily unavailable')
+    return ValueError("Failed to generate summary")
+
+
+async def generate_summary(content: str, strategy: str, key: str) -> Tuple[str, str]:
+    """Generate a summary and cache it unless it is a fallback; returns ``(summary, engine)``."""
+    summary, engine = await get_chapter_summary(content, strategy)
+    # A fallback summary only stands in until the model is reachable again
+    if engine == 'remote':
+        await asyncio.to_thread(reader.get_state().summary_cache.set, key, summary)
+    return summary, engine
+
+
+async def read_summary_request(scope: Scope, receive: Receive) -> Tuple[Dict[str, str], str, str, str, str]:
+    """Rate limit and validate a summary request; returns (headers, content, mode, strategy, cache key)."""
+    headers = await check_rate_limit(scope)
+    payload = await read_json(receive)
+    content = payload.get('content')
+    if not content:
+        raise HTTPError(400, 'No content provided', headers)
+    try:
+        reader.validate_summary_content(content)
+        mode = reader.resolve_summary_mode(payload.get('mode'))
+        strategy = reader.resolve_summary_strategy(content, payload.get('strategy'))
+    except ValueError as e:
+        raise HTTPError(400, str(e), headers)
+    return headers, content, mode, strategy, reader.summary_cache_key(content, strategy)
+
+
+async def summarize(scope: Scope, receive: Receive, send: Send) -> None:
+    """Async counterpart of the Flask ``/summarize`` view."""
+    start = time.perf_counter()
+    headers, content, mode, strategy, key = await read_summary_request(scope, receive)
+    timings = []
+    phase_start = time.perf_counter()
+    if mode == 'extractive':
+        summary = await asyncio.to_thread(reader.extractive_chapter_summary, content)
+        cached, engine = False, 'extractive'
+        timings.append(('extractive', time.perf_counter() - phase_start))
+    else:
+        summary = await asyncio.to_thread(reader.get_state().summary_cache.get, key)
+        timings.append(('cache', time.perf_counter() - phase_start))
+        cached, engine = summary is not None, 'remote'
+    if summary is None:
+        phase_start = time.perf_counter()
+        try:
+            # Concurrent misses for the same key share one generation, as in the Flask view
+            (summary, engine), cached = await reader.get_state().async_summary_flights.do(
+                key, lambda: generate_summary(content, strategy, key)
+            )
+        except UpstreamUnavailableError as e:
+            raise HTTPError(503, str(e), dict(headers, **{'Retry-After': str(max(1, math.ceil(e.retry_after)))}))
+        except ValueError as e:
+            raise HTTPError(400, str(e), headers)
+        timings.append(('openai', time.perf_counter() - phase_start))
+    timings.append(('total', time.perf_counter() - start))
+    headers = dict(headers, **{'Server-Timing': server_timing(timings)})
+    await send_json(send, 200, {'summary': summary, 'cached': cached, 'engine': engine}, headers,
+                    request_header(scope, b'accept-encoding'))
+
+
+async def summarize_stream(scope: Scope, receive: Receive, send: Send) -> None:
+    """Async counterpart of the Flask ``/summarize/stream`` view."""
+    headers, content, mode, strategy, key = await read_summary_request(scope, receive)
+    cached = await asyncio.to_thread(reader.get_state().summary_cache.get, key) if mode == 'remote' else None
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers(
+        'text/event-stream; charset=utf-8', dict(headers, **{'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    )})
+
+    async def emit(event: str, data: Dict, more: bool = True) -> None:
+        await send({'type': 'http.response.body', 'body': reader.sse_event(event, data).encode('utf-8'),
+                    'more_body': more})
+
+    if mode == 'extractive':
+        await emit('token', {'token': await asyncio.to_thread(reader.extractive_chapter_summary, content)})
+        await emit('done', {'cached': False, 'engine': 'extractive'}, more=False)
+        return
+    if cached is not None:
+        await emit('token', {'token': cached})
+        await emit('done', {'cached': True, 'engine': 'remote'}, more=False)
+        return
+
+    fallback = reader.app.config['SUMMARY']['fallback']
+    ttft = None
+    leading = False
+
+    async def stream_summary() -> Tuple[str, str]:
+        """Stream tokens to this client as they arrive; requests that join meanwhile get the whole summary."""
+        nonlocal ttft, leading
+        leading = True
+        start = time.perf_counter()
+        deadline = reader.summary_deadline(fallback)
+        parts = []
+        try:
+            if strategy == 'map_reduce':
+                request_args = reader.summary_request(await map_chapter(content, deadline), reader.REDUCE_INSTRUCTION)
+            else:
+                request_args = reader.summary_request(content)
+            stream = await create_completion(deadline, **request_args, stream=True)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        reader.record_ttft(ttft)
+                    parts.append(chunk.choices[0].delta.content)
+                    await emit('token', {'token': chunk.choices[0].delta.content})
+        except Exception as e:
+            logger.warning(f"Error streaming summary: {e}")
+            if fallback and not parts:
+                summary, engine = await asyncio.to_thread(reader.fallback_summary, content)
+                await emit('token', {'token': summary})
+                return summary, engine
+            raise summary_error(e) from e
+
+        summary = ''.join(parts)
+        if parts:
+            await asyncio.to_thread(reader.get_state().summary_cache.set, key, summary)
+        return summary, 'remote'
+
+    try:
+        (summary, engine), shared = await reader.get_state().async_summary_flights.do(key, stream_summary)
+    except Exception:
+        # Only a request that joined another's failed call has sent nothing yet
+        if fallback and not leading:
+            summary, engine = await asyncio.to_thread(reader.fallback_summary, content)
+            await emit('token', {'token': summary})
+            await emit('done', {'cached': False, 'engine': engine}, more=False)
+        else:
+            await emit('error', {'error': 'Failed to generate summary'}, more=False)
+        return
+
+    if shared:
+        await emit('token', {'token': summary})
+        await emit('done', {'cached': True, 'engine': engine}, more=False)
+    elif engine == 'remote':
+        await emit('done', {'cached': False, 'engine': 'remote',
+                            'ttft_ms': round(ttft * 1000, 1) if ttft is not None else None}, more=False)
+    else:
+        await emit('done', {'cached': False, 'engine': engine}, more=False)
+
+
+NATIVE_ROUTES = {
+    ('POST', '/summarize'): summarize,
+    ('POST', '/summarize/stream'): summarize_stream,
+}
+
+
+async def lifespan(receive: Receive, send: Send) -> None:
+    global async_client
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if async_client is not None:
+                await async_client.close()
+                async_client = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler = NATIVE_ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if handler is None:
+        return await wsgi_application(scope, receive, send)
+
+    try:
+        # The handlers share the Flask app's configuration and state
+        with reader.app.app_context():
+            await handler(scope, receive, send)
+    except HTTPError as e:
+        await send_json(send, e.status, {'error': e.message}, e.headers)
+    except Exception as e:
+        logger.warning(f"Error handling {scope['path']}: {e}")
+        await send_json(send, 500, {'error': 'Internal server error'}, {})
@@ -0,0 +1,83 @@
+"""
+Measure bytes on the wire for a book's table of contents and chapters.
+
+Usage:
+    OPENAI_API_KEY=dummy python benchmarks/bench_compression.py path/to/book.epub path/to/book.pdf
+
+Each book is uploaded, then its TOC and every chapter are fetched with each
+content coding the server supports, and once more with If-None-Match as a
+browser revalidating its cache would. Without arguments a synthetic EPUB
+and PDF are used.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('RATE_LIMIT_REQUESTS', '1000000')
+
+import compression  # noqa: E402
+from app import app  # noqa: E402
+from tests.book_factory import make_pdf, make_epub, sample_text  # noqa: E402
+
+
+def wire_bytes(response) -> int:
+    """Body plus header bytes, roughly as sent over HTTP/1.1."""
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.items())
+    return len(response.data) + headers
+
+
+def measure_book(client, name: str, data: bytes) -> dict:
+    upload = client.post('/upload', data={'file': (io.BytesIO(data), name)}, content_type='multipart/form-data')
+    assert upload.status_code == 200, upload.get_json()
+    book_id = upload.get_json()['book_id']
+    urls = [f'/books/{book_id}'] + [f'/books/{book_id}/chapters/{i}' for i in range(len(upload.get_json()['chapters']))]
+
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+    result = {'book': name, 'size_bytes': len(data), 'responses': len(urls)}
+    for encoding in encodings:
+        result[encoding] = sum(wire_bytes(client.get(url, headers={'Accept-Encoding': encoding})) for url in urls)
+
+    revalidated = 0
+    for url in urls:
+        etag = client.get(url).headers['ETag']
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        revalidated += wire_bytes(response)
+    result['revalidated_304'] = revalidated
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('books', nargs='*', help='EPUB or PDF files to measure')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    if args.books:
+        books = [(os.path.basename(path), open(path, 'rb').read()) for path in args.books]
+    else:
+        books = [('synthetic.epub', make_epub([sample_text(i, repeat=40) for i in range(30)])),
+                 ('synthetic.pdf', make_pdf([sample_text(i, repeat=12) for i in range(100)]))]
+
+    client = app.test_client()
+    results = [measure_book(client, name, data) for name, data in books]
+
+    print(f"{'book':<24} {'identity':>10} {'gzip':>10} {'br':>10} {'saved':>7} {'304s':>8}")
+    for result in results:
+        best = min(result.get('br', result['gzip']), result['gzip'])
+        br = result.get('br')
+        print(f"{result['book'][:24]:<24} {result['identity']:>10} {result['gzip']:>10} "
+              f"{br if br is not None else '-':>10} {1 - best / result['identity']:>6.0%} {result['revalidated_304']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'compression', 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark serial vs. process-pool PDF extraction across page counts.
+
+Usage:
+    OPENAI_API_KEY=dummy python benchmarks/bench_pdf_extraction.py --pages 50 200 1000 --workers 4
+
+Prints a table and, with --json, writes machine-readable results.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, extract_chapters_pdf  # noqa: E402
+from tests.book_factory import make_pdf, sample_text  # noqa: E402
+
+
+def time_extraction(path: str, workers: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(extract_chapters_pdf(path, workers=workers))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    app.config['PDF_PARALLEL_MIN_PAGES'] = 1
+    # The extractor reads its settings from the current app
+    app.app_context().push()
+    # Warm up the pool so process start-up is not billed to the first size
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as warmup:
+        warmup.write(make_pdf([sample_text(0)]))
+        warmup.flush()
+        list(extract_chapters_pdf(warmup.name, workers=args.workers))
+
+    results = []
+    print(f"{'pages':>7} {'serial s':>10} {'parallel s':>11} {'speedup':>8}  (workers={args.workers})")
+    for page_count in args.pages:
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf([sample_text(i, repeat=12) for i in range(page_count)]))
+            pdf.flush()
+            serial = time_extraction(pdf.name, 1, args.repeat)
+            parallel = time_extraction(pdf.name, args.workers, args.repeat)
+        speedup = serial / parallel if parallel else float('inf')
+        results.append({'pages': page_count, 'workers': args.workers,
+                        'serial_s': serial, 'parallel_s': parallel, 'speedup': speedup})
+        print(f"{page_count:>7} {serial:>10.3f} {parallel:>11.3f} {speedup:>7.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'pdf_extraction', 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure worker startup: importing the app module, creating the app and
+answering the first request, each in a fresh interpreter.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10 --path /
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; timings start before the app module is imported
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app as reader
+imported = time.perf_counter()
+application = reader.create_app()
+created = time.perf_counter()
+response = application.test_client().get(sys.argv[1])
+assert response.status_code == 200, response.status_code
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - start) * 1000,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def run_once(path: str, env: dict) -> dict:
+    output = subprocess.run([sys.executable, '-c', CHILD, path], cwd=ROOT, env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='first request to answer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, CACHE_FOLDER=cache, PYTHONDONTWRITEBYTECODE='')
+        run_once(args.path, env)  # Warm the bytecode and OS file caches
+        runs = [run_once(args.path, env) for _ in range(args.runs)]
+
+    print(f"{'metric':<20} {'median':>10} {'min':>10} {'max':>10}")
+    for metric in ('import_ms', 'create_ms', 'first_response_ms', 'total_ms', 'modules'):
+        values = [run[metric] for run in runs]
+        print(f"{metric:<20} {statistics.median(values):>10.1f} {min(values):>10.1f} {max(values):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
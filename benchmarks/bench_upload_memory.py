@@ -0,0 +1,78 @@
+"""
+Measure peak Python memory and disk writes per /upload, in memory vs. spooled.
+
+Usage:
+    OPENAI_API_KEY=dummy python benchmarks/bench_upload_memory.py --pages 50 500
+
+Every upload uses a fresh book so parsing is never skipped by the book cache.
+Disk writes are read from /proc/self/io and are only reported on Linux.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('RATE_LIMIT_REQUESTS', '1000000')
+
+from app import app  # noqa: E402
+from tests.book_factory import make_pdf, make_epub, sample_text  # noqa: E402
+
+
+def bytes_written() -> int:
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(': ') for line in f.read().splitlines())
+        return int(fields['wchar'])
+    except (OSError, KeyError):
+        return 0
+
+
+def measure_upload(client, data: bytes, filename: str) -> dict:
+    body = {'file': (io.BytesIO(data), filename)}
+    tracemalloc.start()
+    written = bytes_written()
+    start = time.perf_counter()
+    response = client.post('/upload', data=body, content_type='multipart/form-data')
+    elapsed = time.perf_counter() - start
+    written = bytes_written() - written
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.get_json()
+    return {'seconds': elapsed, 'peak_mb': peak / 2 ** 20, 'written_mb': written / 2 ** 20}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    app.config['PDF_EXTRACT_WORKERS'] = 1
+    results = []
+    print(f"{'format':>6} {'pages':>6} {'size MB':>8} {'mode':>9} {'time s':>7} {'peak MB':>8} {'written MB':>11}")
+    for page_count in args.pages:
+        for fmt, make in (('pdf', make_pdf), ('epub', make_epub)):
+            for mode, spool_max in (('in_memory', 10 ** 12), ('spooled', 0)):
+                # A unique marker keeps every upload out of the book cache
+                data = make([sample_text(i, repeat=12) + f' {mode}-{time.time_ns()}' for i in range(page_count)])
+                app.config['UPLOAD_SPOOL_MAX_BYTES'] = spool_max
+                result = measure_upload(client, data, f'book.{fmt}')
+                result.update(format=fmt, pages=page_count, size_mb=len(data) / 2 ** 20, mode=mode)
+                results.append(result)
+                print(f"{fmt:>6} {page_count:>6} {result['size_mb']:>8.2f} {mode:>9} {result['seconds']:>7.3f} "
+                      f"{result['peak_mb']:>8.1f} {result['written_mb']:>11.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'upload_memory', 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
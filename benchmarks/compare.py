@@ -0,0 +1,87 @@
+"""
+Compare two benchmark suite result files and flag regressions.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.1
+
+Results are matched by benchmark name and parameters. A metric regresses
+when it moves in the wrong direction by more than --threshold (a fraction);
+from a zero baseline any move in the wrong direction counts, and any
+increase in errors is a regression regardless of the threshold. Exits
+with status 1 if any metric regressed, so it can gate a release.
+"""
+
+import argparse
+import json
+import math
+import sys
+from typing import Dict, List, Tuple
+
+# Metrics where a bigger number is better; all others are costs
+HIGHER_IS_BETTER = {'units_per_s', 'mb_per_s', 'requests_per_s', 'upstream_max_in_flight'}
+# Metrics where any increase is a regression, whatever the threshold
+ZERO_TOLERANCE = {'errors'}
+
+
+def load(path: str) -> Tuple[Dict, Dict[Tuple[str, str], Dict[str, float]]]:
+    with open(path) as f:
+        report = json.load(f)
+    results = {
+        (result['name'], json.dumps(result['params'], sort_keys=True)): result['metrics']
+        for result in report['results']
+    }
+    return report, results
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> List[Dict]:
+    rows = []
+    for key in sorted(baseline.keys() & candidate.keys()):
+        for metric, old in baseline[key].items():
+            new = candidate[key].get(metric)
+            if new is None:
+                continue
+            if old:
+                change = (new - old) / old
+            else:
+                # No relative change from zero: any move is unbounded
+                change = math.copysign(math.inf, new) if new else 0.0
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            regressed = new > old if metric in ZERO_TOLERANCE else worse > threshold
+            rows.append({
+                'name': key[0], 'params': key[1], 'metric': metric, 'baseline': old, 'candidate': new,
+                'change': change, 'regressed': regressed,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1, help='tolerated change, e.g. 0.1 for 10%%')
+    args = parser.parse_args()
+
+    baseline_report, baseline = load(args.baseline)
+    candidate_report, candidate = load(args.candidate)
+    print(f"baseline  {baseline_report.get('revision')} ({baseline_report.get('created')})")
+    print(f"candidate {candidate_report.get('revision')} ({candidate_report.get('created')})")
+    if baseline_report.get('cpu_count') != candidate_report.get('cpu_count'):
+        print('warning: results come from machines with different CPU counts')
+
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        flag = 'REGRESSED' if row['regressed'] else ''
+        print(f"{row['name']:<16} {row['params']:<44} {row['metric']:<22} "
+              f"{row['baseline']:>10.4g} {row['candidate']:>10.4g} {row['change']:>+8.1%} {flag}")
+
+    missing = sorted(baseline.keys() - candidate.keys())
+    for name, params in missing:
+        print(f"{name:<16} {params:<44} missing from candidate")
+
+    regressions = sum(row['regressed'] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Load test the async /summarize path against a local fake OpenAI server.
+
+Usage:
+    OPENAI_API_KEY=dummy python benchmarks/load_async_summarize.py --concurrency 500 --latency 2
+
+Drives the ASGI application in-process from one event loop, so the numbers
+reflect what a single worker process can keep in flight.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('RATE_LIMIT_REQUESTS', '1000000')
+os.environ.setdefault('OPENAI_REQUESTS_PER_MINUTE', '0')
+
+import openai  # noqa: E402
+
+import asgi  # noqa: E402
+from tests.asgi_client import call  # noqa: E402
+from tests.fake_openai import FakeOpenAIServer  # noqa: E402
+
+
+async def run(concurrency: int, unique: bool) -> dict:
+    latencies = []
+
+    async def one(i: int):
+        content = f"Load test chapter {i if unique else 0}. " + "The story continues at length. " * 20
+        start = time.perf_counter()
+        status, _, _ = await call(asgi.application, 'POST', '/summarize', {'content': content})
+        latencies.append(time.perf_counter() - start)
+        return status
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(one(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': concurrency,
+        'ok': sum(status == 200 for status in statuses),
+        'wall_s': elapsed,
+        'throughput_rps': concurrency / elapsed,
+        'p50_s': latencies[len(latencies) // 2],
+        'p99_s': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=1.0, help='fake model latency in seconds')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    # Per-request HTTP client logging would dominate the output
+    logging.disable(logging.INFO)
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        asgi.async_client = openai.AsyncOpenAI(api_key='dummy', base_url=server.base_url, max_retries=0)
+        result = asyncio.run(run(args.concurrency, unique=True))
+        result.update(latency_s=args.latency, upstream_max_in_flight=server.max_in_flight)
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'async_summarize', 'results': [result]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark suite for extraction, upload and summarize paths.
+
+Usage:
+    OPENAI_API_KEY=dummy python benchmarks/suite.py --json results.json
+    OPENAI_API_KEY=dummy python benchmarks/suite.py --sizes 10 100 --only extract upload --json quick.json
+    python benchmarks/compare.py baseline.json results.json
+
+Books are synthetic EPUBs and PDFs with one chapter or page per unit of
+size. Each upload gets a unique book so the book cache never short-cuts
+parsing. Summaries run against a local fake OpenAI-compatible server whose
+latency is set with --latency, so results measure this app rather than the
+API. Timings are the best of --repeat runs; peak memory is traced in one
+extra run, because tracemalloc slows the code it measures. tracemalloc
+only sees this process, so that run extracts PDFs in process rather than
+on the worker pool.
+"""
+
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('RATE_LIMIT_REQUESTS', '1000000')
+os.environ.setdefault('OPENAI_REQUESTS_PER_MINUTE', '0')
+
+import openai  # noqa: E402
+
+import app as reader  # noqa: E402
+import asgi  # noqa: E402
+from tests.asgi_client import call  # noqa: E402
+from tests.book_factory import make_pdf, make_epub, sample_text  # noqa: E402
+from tests.fake_openai import FakeOpenAIServer  # noqa: E402
+
+BENCHMARKS = ('extract', 'upload', 'summarize')
+
+
+def make_book(fmt: str, size: int, marker: str) -> bytes:
+    if fmt == 'pdf':
+        return make_pdf([sample_text(i, repeat=12) + f' {marker}' for i in range(size)])
+    return make_epub([sample_text(i, repeat=12) + f' {marker}' for i in range(size)])
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def measure(run: Callable[[], None], repeat: int) -> Dict[str, float]:
+    """
+    Best wall time over ``repeat`` runs, then traced peak memory of one more
+    with a single PDF extraction worker, so pages are extracted where
+    tracemalloc can see them.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    config = reader.app.config
+    workers = config['PDF_EXTRACT_WORKERS']
+    config['PDF_EXTRACT_WORKERS'] = 1
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        config['PDF_EXTRACT_WORKERS'] = workers
+    return {'seconds': best, 'peak_mb': peak / 2 ** 20}
+
+
+def bench_extract(fmt: str, size: int, repeat: int) -> Dict[str, float]:
+    extract = reader.extract_chapters_pdf if fmt == 'pdf' else reader.extract_chapters_epub
+    with tempfile.NamedTemporaryFile(suffix=f'.{fmt}') as book, reader.app.app_context():
+        book.write(make_book(fmt, size, 'extract'))
+        book.flush()
+        metrics = measure(lambda: list(extract(book.name)), repeat)
+    metrics['units_per_s'] = size / metrics['seconds']
+    return metrics
+
+
+def bench_upload(fmt: str, size: int, repeat: int) -> Dict[str, float]:
+    client = reader.app.test_client()
+    # Built up front so generating books is not timed
+    books = [make_book(fmt, size, f'upload-{time.time_ns()}-{i}') for i in range(repeat + 1)]
+    size_mb = len(books[0]) / 2 ** 20
+
+    def upload():
+        response = client.post('/upload', data={'file': (io.BytesIO(books.pop()), f'book.{fmt}')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+
+    metrics = measure(upload, repeat)
+    metrics['units_per_s'] = size / metrics['seconds']
+    metrics['mb_per_s'] = size_mb / metrics['seconds']
+    return metrics
+
+
+def bench_summarize_wsgi(server: FakeOpenAIServer, concurrency: int, requests: int) -> Dict[str, float]:
+    """Summaries through the Flask view, ``concurrency`` requests at a time on worker threads."""
+    client = reader.app.test_client()
+    run_id = time.time_ns()
+    latencies = []
+
+    def summarize(i: int) -> int:
+        start = time.perf_counter()
+        response = client.post('/summarize', json={'content': f'WSGI benchmark chapter {run_id}-{i}. ' + sample_text(i)})
+        latencies.append(time.perf_counter() - start)
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = list(pool.map(summarize, range(requests)))
+    elapsed = time.perf_counter() - start
+    return summary_metrics(statuses, latencies, elapsed, server)
+
+
+def bench_summarize_asgi(server: FakeOpenAIServer, concurrency: int, requests: int) -> Dict[str, float]:
+    """Summaries through the native async view, ``concurrency`` requests at a time on one event loop."""
+    run_id = time.time_ns()
+    latencies = []
+
+    async def summarize(i: int, semaphore: asyncio.Semaphore) -> int:
+        async with semaphore:
+            start = time.perf_counter()
+            status, _, _ = await call(asgi.application, 'POST', '/summarize',
+                                      {'content': f'ASGI benchmark chapter {run_id}-{i}. ' + sample_text(i)})
+            latencies.append(time.perf_counter() - start)
+            return status
+
+    async def run() -> List[int]:
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(*(summarize(i, semaphore) for i in range(requests)))
+        finally:
+            await asgi.async_client.close()
+
+    asgi.async_client = openai.AsyncOpenAI(api_key='dummy', base_url=server.base_url, max_retries=0)
+    start = time.perf_counter()
+    statuses = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    asgi.async_client = None
+    return summary_metrics(statuses, latencies, elapsed, server)
+
+
+def summary_metrics(statuses: List[int], latencies: List[float], elapsed: float,
+                    server: FakeOpenAIServer) -> Dict[str, float]:
+    return {
+        'seconds': elapsed,
+        'requests_per_s': len(statuses) / elapsed,
+        'errors': sum(status != 200 for status in statuses),
+        'p50_s': percentile(latencies, 0.5),
+        'p95_s': percentile(latencies, 0.95),
+        'upstream_max_in_flight': server.max_in_flight,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 2000],
+                        help='pages (PDF) or chapters (EPUB) per book')
+    parser.add_argument('--formats', nargs='+', default=['epub', 'pdf'], choices=['epub', 'pdf'])
+    parser.add_argument('--only', nargs='+', default=list(BENCHMARKS), choices=BENCHMARKS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=64, help='summarize requests per concurrency level')
+    parser.add_argument('--latency', type=float, default=0.2, help='fake model latency in seconds')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    # Per-request logging would dominate the output and the timings
+    logging.disable(logging.INFO)
+
+    results = []
+
+    def record(name: str, params: Dict, metrics: Dict) -> None:
+        results.append({'name': name, 'params': params, 'metrics': metrics})
+        shown = ' '.join(f'{key}={value:.4g}' for key, value in metrics.items())
+        print(f"{name:<16} {json.dumps(params):<40} {shown}", flush=True)
+
+    for fmt in args.formats:
+        for size in args.sizes:
+            if 'extract' in args.only:
+                params = {'size': size}
+                if fmt == 'pdf':  # Only PDFs are extracted on the worker pool
+                    params['workers'] = reader.app.config['PDF_EXTRACT_WORKERS']
+                record(f'extract_{fmt}', params, bench_extract(fmt, size, args.repeat))
+            if 'upload' in args.only:
+                record(f'upload_{fmt}', {'size': size}, bench_upload(fmt, size, args.repeat))
+
+    if 'summarize' in args.only:
+        for concurrency in args.concurrency:
+            params = {'concurrency': concurrency, 'requests': args.requests, 'latency_s': args.latency}
+            for name, bench in (('summarize_wsgi', bench_summarize_wsgi), ('summarize_asgi', bench_summarize_asgi)):
+                with FakeOpenAIServer(latency=args.latency) as server:
+                    client = openai.OpenAI(api_key='dummy', base_url=server.base_url, max_retries=0)
+                    reader.get_state(reader.app).client = client
+                    record(name, params, bench(server, concurrency, args.requests))
+
+    report = {
+        'suite': 'book-reader',
+        'revision': git_revision(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the shape of stored chapters changes so stale archives are
+# treated as misses instead of being served.
+FORMAT_VERSION = 4
+
+MANIFEST_NAME = 'manifest.json'
+BOOK_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Assets in these formats are already compressed; deflating them again only costs CPU
+STORED_MEDIA_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'font/woff', 'font/woff2'}
+
+# (href, media type, bytes) of an image, font or stylesheet that belongs to a book
+Asset = Tuple[str, str, bytes]
+
+
+def is_valid_book_id(book_id: str) -> bool:
+    """Check that a book ID is a hex SHA-256 digest."""
+    return bool(BOOK_ID_PATTERN.match(book_id or ''))
+
+
+class BookStore:
+    """
+    Content-addressed, size-capped store of extracted books.
+
+    Each book is kept as one deflate-compressed zip archive named after the
+    SHA-256 digest of the uploaded bytes. The archive holds a manifest (the
+    table of contents and asset index), one member per chapter and one per
+    asset, so single chapters and assets can be read without inflating the
+    whole book, plus the members of the book's search index. Least recently
+    used archives are evicted once the total size on disk exceeds
+    ``max_bytes``; file modification times record recency so the order
+    survives restarts.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _path(self, book_id: str) -> Path:
+        return self.root / book_id[:2] / f'{book_id}.zip'
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from the archives already on disk."""
+        found = []
+        for path in self.root.glob('*/*.zip'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, book_id, size in sorted(found):
+            self._entries[book_id] = size
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def __contains__(self, book_id: str) -> bool:
+        return self._path(book_id).exists()
+
+    def _read_manifest(self, archive: zipfile.ZipFile) -> Dict:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"unsupported format version {manifest.get('version')}")
+        return manifest
+
+    def _read(self, book_id: str, count: bool, reader):
+        """
+        Open a book archive and pass it to ``reader`` with its manifest.
+
+        Records a hit or miss when ``count`` is set. Unreadable or outdated
+        archives are removed and reported as misses.
+        """
+        path = self._path(book_id)
+        try:
+            with zipfile.ZipFile(path) as archive:
+                result = reader(archive, self._read_manifest(archive))
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(book_id, None)
+                self.misses += count
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached book {book_id}: {e}")
+            self._discard(book_id)
+            with self._lock:
+                self.misses += count
+            return None
+
+        self._touch(book_id, path)
+        with self._lock:
+            self.hits += count
+        return result
+
+    def get(self, book_id: str) -> Optional[List[Dict[str, str]]]:
+        """Return all stored chapters for a book, or None on a miss."""
+        return self._read(book_id, True, lambda archive, manifest: [
+            {'title': entry['title'], 'content': archive.read(f'chapters/{i}').decode('utf-8')}
+            for i, entry in enumerate(manifest['chapters'])
+        ])
+
+    def get_toc(self, book_id: str) -> Optional[List[Dict[str, object]]]:
+        """Return chapter titles and sizes for a book, or None on a miss."""
+        return self._read(book_id, True, lambda archive, manifest: manifest['chapters'])
+
+    def get_chapter(self, book_id: str, index: int) -> Optional[Dict[str, str]]:
+        """Return a single chapter, or None if the book or chapter is unknown."""
+        def read_chapter(archive, manifest):
+            if not 0 <= index < len(manifest['chapters']):
+                return None
+            return {
+                'title': manifest['chapters'][index]['title'],
+                'content': archive.read(f'chapters/{index}').decode('utf-8'),
+            }
+        return self._read(book_id, False, read_chapter)
+
+    def get_asset(self, book_id: str, href: str) -> Optional[Tuple[Dict[str, object], bytes]]:
+        """Return ``(info, data)`` for one asset, or None if the book or asset is unknown."""
+        def read_asset(archive, manifest):
+            info = manifest['assets'].get(href)
+            if info is None:
+                return None
+            return info, archive.read(f'assets/{href}')
+        return self._read(book_id, False, read_asset)
+
+    def get_index(self, book_id: str) -> Optional[Dict[str, bytes]]:
+        """Return the stored search index members of a book, or None on a miss."""
+        return self._read(book_id, False, lambda archive, manifest: {
+            name: archive.read(f'index/{name}') for name in manifest['index']
+        })
+
+    def put(self, book_id: str, chapters: List[Dict[str, str]], assets: Iterable[Asset] = (),
+            index: Optional[Dict[str, bytes]] = None) -> None:
+        """
+        Store extracted chapters, assets and search index members for a book
+        and evict old entries if needed.
+
+        ``assets`` may be a generator; each asset is written as it is produced.
+        """
+        path = self._path(book_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            'version': FORMAT_VERSION,
+            'chapters': [
+                {'title': chapter['title'], 'size': len(chapter['content'])}
+                for chapter in chapters
+            ],
+            'assets': {},
+            'index': sorted(index or {}),
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                with zipfile.ZipFile(tmp_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                    for i, chapter in enumerate(chapters):
+                        archive.writestr(f'chapters/{i}', chapter['content'].encode('utf-8'))
+                    for name, data in (index or {}).items():
+                        archive.writestr(f'index/{name}', data)
+                    for href, media_type, data in assets:
+                        compression = zipfile.ZIP_STORED if media_type in STORED_MEDIA_TYPES else zipfile.ZIP_DEFLATED
+                        archive.writestr(f'assets/{href}', data, compress_type=compression)
+                        manifest['assets'][href] = {
+                            'media_type': media_type,
+                            'size': len(data),
+                            'etag': hashlib.sha256(data).hexdigest()[:32],
+                        }
+                    # Written last so it can index the assets
+                    archive.writestr(MANIFEST_NAME, json.dumps(manifest))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._entries[book_id] = path.stat().st_size
+            self._entries.move_to_end(book_id)
+        self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _touch(self, book_id: str, path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if book_id in self._entries:
+                self._entries.move_to_end(book_id)
+
+    def _discard(self, book_id: str) -> None:
+        with self._lock:
+            self._entries.pop(book_id, None)
+        try:
+            os.remove(self._path(book_id))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                # Never evict the only remaining entry, even if it is over the cap
+                if self.total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                book_id, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+            try:
+                os.remove(self._path(book_id))
+            except OSError:
+                pass
+            logger.info(f"Evicted cached book {book_id}")
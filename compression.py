@@ -0,0 +1,40 @@
+"""
+Response body compression shared by the Flask and ASGI entry points.
+
+Brotli is preferred when the optional ``brotli`` package is installed and
+the client accepts it; gzip is used otherwise.
+"""
+
+import gzip
+from typing import Dict, Optional
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain', 'application/javascript', 'image/svg+xml',
+}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the content coding for an ``Accept-Encoding`` header, or None to send the body as is."""
+    accept = parse_accept_header(accept_encoding or '', Accept)
+    if brotli is not None and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, settings: Dict[str, int]) -> bytes:
+    """Compress ``data`` with the ``gzip_level`` or ``brotli_quality`` from ``settings``."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=settings['brotli_quality'])
+    # A fixed mtime keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=settings['gzip_level'], mtime=0)
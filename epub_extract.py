@@ -0,0 +1,174 @@
+"""
+Streaming EPUB extraction.
+
+Reads the OPF package document to find the spine, then reads only the
+XHTML documents it lists, one archive member at a time. Images, fonts and
+stylesheets are read separately, also one at a time, so memory use is
+bounded by the largest single member rather than by the size of the book.
+"""
+
+import logging
+import posixpath
+import re
+import zipfile
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+# The package documents come from user uploads: refuse DTDs, entities and external references
+import defusedxml.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_PATH = 'META-INF/container.xml'
+CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+OPF_NS = '{http://www.idpf.org/2007/opf}'
+DOCUMENT_MEDIA_TYPES = {'application/xhtml+xml', 'text/html'}
+# Resources that chapters reference and the reader serves alongside them
+ASSET_MEDIA_TYPE_PREFIXES = ('image/', 'font/', 'text/css', 'application/font-', 'application/x-font-',
+                             'application/vnd.ms-opentype')
+# The package document is parsed in memory, so it gets its own small limit
+MAX_PACKAGE_BYTES = 4 * 1024 * 1024
+# src="..." and href="..." attributes, including xlink:href on SVG images
+LINK_ATTRIBUTE = re.compile(r"""(?P<attr>(?:\bsrc|\bhref|xlink:href)\s*=\s*)(?P<quote>["'])(?P<url>[^"']*)(?P=quote)""")
+
+
+class EpubLimitError(ValueError):
+    """Raised when an archive exceeds the configured extraction limits."""
+
+
+class Package(NamedTuple):
+    # (href, member name) of every spine document, in reading order
+    documents: List[Tuple[str, str]]
+    # href -> (member name, media type) of every image, font and stylesheet
+    assets: Dict[str, Tuple[str, str]]
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    """Read one member, refusing to decompress more than ``limit`` bytes."""
+    if info.file_size > limit:
+        raise EpubLimitError('EPUB file is too large to process')
+    with archive.open(info) as member:
+        data = member.read(limit + 1)
+    if len(data) > limit:
+        raise EpubLimitError('EPUB file is too large to process')
+    return data
+
+
+def _open_archive(source: Union[str, BinaryIO], max_members: int) -> zipfile.ZipFile:
+    archive = zipfile.ZipFile(source)
+    if len(archive.infolist()) > max_members:
+        archive.close()
+        raise EpubLimitError('EPUB file has too many entries')
+    return archive
+
+
+def _package_path(archive: zipfile.ZipFile) -> str:
+    container = ET.fromstring(_read_member(archive, archive.getinfo(CONTAINER_PATH), MAX_PACKAGE_BYTES))
+    for rootfile in container.iter(f'{CONTAINER_NS}rootfile'):
+        if rootfile.get('media-type') == 'application/oebps-package+xml' and rootfile.get('full-path'):
+            return rootfile.get('full-path')
+    raise ValueError('EPUB container does not name a package document')
+
+
+def read_package(archive: zipfile.ZipFile) -> Package:
+    """
+    Read the spine documents and assets listed in the package document.
+
+    Hrefs are manifest paths relative to the package document, which is
+    what ebooklib reports as the item name.
+    """
+    opf_path = _package_path(archive)
+    package = ET.fromstring(_read_member(archive, archive.getinfo(opf_path), MAX_PACKAGE_BYTES))
+    base = posixpath.dirname(opf_path)
+
+    manifest: Dict[str, Tuple[str, str]] = {}
+    assets: Dict[str, Tuple[str, str]] = {}
+    for item in package.iter(f'{OPF_NS}item'):
+        href = item.get('href')
+        if not item.get('id') or not href:
+            continue
+        href = unquote(href)
+        media_type = item.get('media-type', '')
+        manifest[item.get('id')] = (href, media_type)
+        if media_type.startswith(ASSET_MEDIA_TYPE_PREFIXES):
+            assets[posixpath.normpath(href)] = (posixpath.normpath(posixpath.join(base, href)), media_type)
+
+    documents = []
+    seen = set()
+    for itemref in package.iter(f'{OPF_NS}itemref'):
+        href, media_type = manifest.get(itemref.get('idref'), (None, None))
+        if href is None or media_type not in DOCUMENT_MEDIA_TYPES or href in seen:
+            continue
+        seen.add(href)
+        documents.append((href, posixpath.normpath(posixpath.join(base, href))))
+    return Package(documents, assets)
+
+
+def rewrite_asset_links(html: str, document_href: str, assets: Dict[str, Tuple[str, str]],
+                        asset_url: Callable[[str], str]) -> str:
+    """Point relative ``src``/``href`` attributes that name a known asset at ``asset_url(href)``."""
+    base = posixpath.dirname(document_href)
+
+    def replace(match):
+        url = urlsplit(match.group('url'))
+        if url.scheme or url.netloc or not url.path or url.path.startswith('/'):
+            return match.group(0)
+        href = posixpath.normpath(posixpath.join(base, unquote(url.path)))
+        if href not in assets:
+            return match.group(0)
+        return f"{match.group('attr')}{match.group('quote')}{asset_url(href)}{match.group('quote')}"
+
+    return LINK_ATTRIBUTE.sub(replace, html)
+
+
+def iter_epub_documents(source: Union[str, BinaryIO], max_bytes: int, max_members: int,
+                        asset_url: Optional[Callable[[str], str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield ``(href, text)`` for each spine document, one member at a time.
+
+    Raises ``EpubLimitError`` if the archive has more than ``max_members``
+    entries or its spine documents would decompress to more than
+    ``max_bytes`` in total. Documents that are missing or not valid UTF-8
+    are skipped. With ``asset_url``, links to images, fonts and stylesheets
+    are rewritten to ``asset_url(asset_href)``.
+    """
+    with _open_archive(source, max_members) as archive:
+        package = read_package(archive)
+        remaining = max_bytes
+        for href, name in package.documents:
+            try:
+                info = archive.getinfo(name)
+            except KeyError:
+                logger.warning(f"EPUB spine document is missing from the archive: {name}")
+                continue
+            data = _read_member(archive, info, remaining)
+            remaining -= len(data)
+            try:
+                text = data.decode('utf-8')
+            except UnicodeDecodeError as e:
+                logger.warning(f"Error decoding chapter content: {e}")
+                continue
+            if asset_url is not None and package.assets:
+                text = rewrite_asset_links(text, href, package.assets, asset_url)
+            yield href, text
+
+
+def iter_epub_assets(source: Union[str, BinaryIO], max_bytes: int,
+                     max_members: int) -> Iterator[Tuple[str, str, bytes]]:
+    """
+    Yield ``(href, media_type, data)`` for each image, font and stylesheet.
+
+    Assets are read one member at a time and share a ``max_bytes`` budget
+    of their own; missing members are skipped.
+    """
+    with _open_archive(source, max_members) as archive:
+        remaining = max_bytes
+        for href, (name, media_type) in read_package(archive).assets.items():
+            try:
+                info = archive.getinfo(name)
+            except KeyError:
+                logger.warning(f"EPUB asset is missing from the archive: {name}")
+                continue
+            data = _read_member(archive, info, remaining)
+            remaining -= len(data)
+            yield href, media_type, data
@@ -0,0 +1,128 @@
+"""
+Extractive chapter summaries, computed locally in milliseconds.
+
+Sentences are weighted by TF-IDF and ranked with TextRank: a PageRank
+over the cosine similarity graph of their TF-IDF vectors, teleporting in
+proportion to each sentence's own TF-IDF weight. The best sentences are
+returned in reading order. This needs no network, so it doubles as the
+fallback when the model is unavailable.
+"""
+
+import re
+from itertools import chain
+from typing import List
+
+import numpy as np
+
+from search_index import TOKEN_PATTERN, html_to_text
+
+# A run of text up to and including its closing punctuation and quotes, or up to a blank line
+SENTENCE_PATTERN = re.compile(r'\S(?:[^.!?\n]|\n(?!\s*\n))*(?:[.!?]+["\'”’)\]]*|(?=\n\s*\n)|$)')
+# Headings, paragraphs and the like end a sentence even without punctuation
+BLOCK_BOUNDARY = re.compile(r'</(?:p|div|h[1-6]|li|dt|dd|blockquote|pre|tr|section|title)\s*>|<br\s*/?>', re.IGNORECASE)
+MIN_SENTENCE_WORDS = 4
+# Text without punctuation, common in PDFs, is cut into pieces of this many words
+MAX_SENTENCE_WORDS = 60
+# Only the most salient sentences enter the similarity graph, which grows quadratically
+MAX_CANDIDATES = 200
+DAMPING = 0.85
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you
+your yours yourself yourselves said says one also
+""".split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences with normalized whitespace, dropping fragments
+    of a few words and repeats of an earlier sentence.
+    """
+    sentences = {}
+    for match in SENTENCE_PATTERN.finditer(text):
+        words = match.group().split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            piece = words[start:start + MAX_SENTENCE_WORDS]
+            if len(piece) >= MIN_SENTENCE_WORDS:
+                sentences.setdefault(' '.join(piece))
+    return list(sentences)
+
+
+def textrank(similarity: np.ndarray, personalization: np.ndarray, damping: float = DAMPING,
+             iterations: int = 100, tolerance: float = 1e-6) -> np.ndarray:
+    """
+    Personalized PageRank over a weighted graph given as a similarity matrix.
+
+    Rows with no edges are treated as linking to the teleport distribution.
+    """
+    n = len(similarity)
+    out_weight = similarity.sum(axis=1)
+    transition = np.divide(similarity, out_weight[:, None], out=np.zeros_like(similarity),
+                           where=out_weight[:, None] > 0)
+    total = personalization.sum()
+    teleport = personalization / total if total > 0 else np.full(n, 1.0 / n)
+    dangling = out_weight == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = damping * (rank @ transition + rank[dangling].sum() * teleport) + (1 - damping) * teleport
+        converged = np.abs(updated - rank).sum() < tolerance
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def summarize(content: str, max_sentences: int = 5) -> str:
+    """Return the ``max_sentences`` most central sentences of ``content`` (HTML or plain text), in order."""
+    text = html_to_text(BLOCK_BOUNDARY.sub('\n\n', content))
+    sentences = split_sentences(text)
+    if not sentences:
+        # Only fragments, such as a title page; they are the summary
+        return ' '.join(text.split()[:MAX_SENTENCE_WORDS])
+    if len(sentences) <= max_sentences:
+        return ' '.join(sentences)
+
+    # Term ids of every word, then only the content words among them
+    tokens = [TOKEN_PATTERN.findall(sentence.lower()) for sentence in sentences]
+    vocabulary = {}
+    cols = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in chain.from_iterable(tokens)),
+                       dtype=np.int64)
+    rows = np.repeat(np.arange(len(sentences)), [len(terms) for terms in tokens])
+    content_terms = np.fromiter((len(term) > 1 and term not in STOPWORDS and not term.isdigit()
+                                 for term in vocabulary), dtype=bool, count=len(vocabulary))
+    keep = content_terms[cols]
+    if not keep.any():
+        return ' '.join(sentences[:max_sentences])
+
+    # Sparse (sentence, term) -> count, as parallel arrays
+    n, v = len(sentences), len(vocabulary)
+    pairs, counts = np.unique(rows[keep] * v + cols[keep], return_counts=True)
+    sentence_ids, term_ids = pairs // v, pairs % v
+    document_frequency = np.bincount(term_ids, minlength=v)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1
+    weights = counts * idf[term_ids]
+    # Mean weight per content word, so long sentences do not win on length alone
+    salience = (np.bincount(sentence_ids, weights=weights, minlength=n)
+                / np.maximum(np.bincount(sentence_ids, minlength=n), 1))
+
+    candidates = np.sort(np.argsort(-salience, kind='stable')[:MAX_CANDIDATES])
+    position = np.full(n, -1)
+    position[candidates] = np.arange(len(candidates))
+    keep = position[sentence_ids] >= 0
+    candidate_terms, term_columns = np.unique(term_ids[keep], return_inverse=True)
+    matrix = np.zeros((len(candidates), len(candidate_terms)))
+    matrix[position[sentence_ids[keep]], term_columns] = weights[keep]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    scores = textrank(similarity, salience[candidates])
+    chosen = np.sort(candidates[np.argsort(-scores, kind='stable')[:max_sentences]])
+    return ' '.join(sentences[i] for i in chosen)
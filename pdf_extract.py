@@ -0,0 +1,112 @@
+"""
+PDF page extraction, optionally spread across a pool of worker processes.
+
+Kept separate from app.py so worker processes only need to import pypdf.
+"""
+
+import atexit
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Smallest number of pages handed to a worker in one task; smaller batches
+# spend more time re-opening the file than extracting text.
+MIN_PAGES_PER_TASK = 8
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def extract_pages(reader: PdfReader, start: int, stop: int) -> Iterator[Tuple[int, str, float]]:
+    """
+    Yield ``(page_index, text, seconds)`` for non-empty pages, skipping pages
+    that fail. ``seconds`` is the time spent extracting that page, measured
+    in whichever process extracted it.
+    """
+    for i in range(start, stop):
+        try:
+            started = time.perf_counter()
+            content = reader.pages[i].extract_text()
+            if content.strip():  # Only include non-empty pages
+                yield i, content, time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Error extracting text from page {i + 1}: {e}")
+            continue
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    """Worker entry point: open the PDF independently and extract a page range."""
+    return list(extract_pages(PdfReader(path), start, stop))
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool, recreating it if the worker count changed."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn avoids forking a multi-threaded server process
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Forget a broken pool, so the next caller of ``get_executor`` starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+atexit.register(shutdown_executor)
+
+
+def split_range(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split ``range(page_count)`` into contiguous batches, a few per worker for load balancing."""
+    size = max(MIN_PAGES_PER_TASK, math.ceil(page_count / (workers * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pages_parallel(path: str, page_count: int, workers: int) -> Iterator[Tuple[int, str, float]]:
+    """
+    Extract pages on the shared process pool, yielding them in page order.
+
+    If the pool breaks, say because a worker was killed, it is discarded
+    and the rest of this book is extracted in this process.
+    """
+    batches = split_range(page_count, workers)
+    executor = get_executor(workers)
+    extracted = 0
+    try:
+        results = executor.map(extract_page_range, repeat(path),
+                               [start for start, _ in batches], [stop for _, stop in batches])
+        for (_, stop), pages in zip(batches, results):
+            yield from pages
+            extracted = stop
+    except BrokenProcessPool as e:
+        logger.warning(f"PDF worker pool broke after {extracted} of {page_count} pages, "
+                       f"extracting the rest in process: {e}")
+        discard_executor(executor)
+        yield from extract_pages(PdfReader(path), extracted, page_count)
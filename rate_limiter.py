@@ -0,0 +1,98 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Delete idle buckets once every this many checks; an idle bucket is
+# indistinguishable from a full one, so dropping it loses nothing.
+CLEANUP_INTERVAL = 1000
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the bucket is full again
+    reset_after: float
+    # Seconds until the next request would be allowed (0 if allowed now)
+    retry_after: float
+
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiter backed by SQLite.
+
+    Each client may burst up to ``requests`` calls, and tokens refill at
+    ``requests / window`` per second. Every check reads and writes one row
+    inside an immediate transaction, so the cost does not depend on traffic.
+    Worker processes that share the database file share the limits.
+    """
+
+    def __init__(self, path: str, requests: int, window: float):
+        self.path = path
+        self.requests = requests
+        self.window = window
+        self._local = threading.local()
+        self._checks = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        db = self._connection()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            ' key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are not shareable between threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def hit(self, key: str) -> RateLimitResult:
+        """Consume one token for ``key`` if available."""
+        rate = self.requests / self.window
+        now = time.time()
+        try:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = float(self.requests) if row is None else min(self.requests, row[0] + (now - row[1]) * rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                db.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                           (key, tokens, now))
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # Fail open: an unavailable limiter must not take the site down
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return RateLimitResult(True, self.requests, self.requests, 0.0, 0.0)
+
+        self._checks += 1
+        if self._checks % CLEANUP_INTERVAL == 0:
+            self._cleanup(now)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=self.requests,
+            remaining=int(math.floor(tokens)),
+            reset_after=(self.requests - tokens) / rate,
+            retry_after=0.0 if allowed else (1 - tokens) / rate,
+        )
+
+    def _cleanup(self, now: float) -> None:
+        try:
+            self._connection().execute('DELETE FROM buckets WHERE updated < ?', (now - self.window,))
+        except sqlite3.Error as e:
+            logger.warning(f"Error cleaning up rate limiter buckets: {e}")
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Optional
+
+
+class RequestBudget:
+    """
+    Blocking token bucket that paces calls to an upstream API.
+
+    Refills at ``per_minute / 60`` tokens per second. The burst size
+    defaults to a tenth of the per-minute budget, so no 60-second window
+    sees more than about 110% of ``per_minute`` calls. A budget of 0
+    disables pacing.
+    """
+
+    def __init__(self, per_minute: int, burst: Optional[int] = None):
+        self.per_minute = per_minute
+        self.capacity = burst if burst is not None else max(1, per_minute // 10)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _reserve(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one will be."""
+        rate = self.per_minute / 60.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waited += seconds
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, waiting for a refill if needed. Returns False on timeout."""
+        if self.per_minute <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            self._record_wait(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, yielding to the event loop while waiting for a refill. Returns False on timeout."""
+        import asyncio  # Only the ASGI entry point needs it, and has it loaded already
+
+        if self.per_minute <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            self._record_wait(wait)
+            await asyncio.sleep(wait)
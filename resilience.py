@@ -0,0 +1,251 @@
+"""
+Failure handling for calls to an upstream API.
+
+``call_with_retries`` and ``call_with_retries_async`` retry transient
+failures with jittered exponential backoff, ``CircuitBreaker`` fails fast
+while the upstream keeps failing, and ``SingleFlight`` and
+``AsyncSingleFlight`` let concurrent identical calls share one execution.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when the upstream cannot serve a call right now; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised instead of calling an upstream that the circuit breaker considers unhealthy."""
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """Raised when the caller's deadline passes before the upstream could be called."""
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Full-jitter exponential backoff: a random delay up to
+    ``base_delay * 2 ** attempt``, capped at ``max_delay``. The jitter keeps
+    clients that failed together from retrying together.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retries(fn: Callable[[], T], is_transient: Callable[[Exception], bool], attempts: int,
+                      base_delay: float, max_delay: float,
+                      retry_after: Callable[[Exception], Optional[float]] = lambda e: None,
+                      on_retry: Callable[[Exception], None] = lambda e: None,
+                      sleep: Callable[[float], None] = time.sleep,
+                      deadline: Optional[float] = None, clock: Callable[[], float] = time.monotonic) -> T:
+    """
+    Call ``fn`` up to ``attempts`` times, retrying only failures that
+    ``is_transient`` accepts. A delay the upstream asks for through
+    ``retry_after`` is honoured, up to ``max_delay``. No retry is started
+    if its delay would run past ``deadline`` (a ``clock()`` value). The
+    last failure is re-raised.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, e, base_delay, max_delay, retry_after)
+            if deadline is not None and clock() + delay >= deadline:
+                raise
+            logger.info(f"Retrying upstream call in {delay:.2f}s after attempt {attempt + 1} failed: {e}")
+            on_retry(e)
+            sleep(delay)
+    raise ValueError('attempts must be at least 1')
+
+
+async def call_with_retries_async(fn: Callable[[], Awaitable[T]], is_transient: Callable[[Exception], bool],
+                                  attempts: int, base_delay: float, max_delay: float,
+                                  retry_after: Callable[[Exception], Optional[float]] = lambda e: None,
+                                  on_retry: Callable[[Exception], None] = lambda e: None,
+                                  deadline: Optional[float] = None) -> T:
+    """Event-loop counterpart of ``call_with_retries``; waits between attempts without holding a thread."""
+    import asyncio  # Only the ASGI entry point needs it, and has it loaded already
+
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, e, base_delay, max_delay, retry_after)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            logger.info(f"Retrying upstream call in {delay:.2f}s after attempt {attempt + 1} failed: {e}")
+            on_retry(e)
+            await asyncio.sleep(delay)
+    raise ValueError('attempts must be at least 1')
+
+
+def retry_delay(attempt: int, error: Exception, base_delay: float, max_delay: float,
+                retry_after: Callable[[Exception], Optional[float]]) -> float:
+    """Backoff before the next attempt, or the delay the upstream asked for if longer (up to ``max_delay``)."""
+    return max(backoff_delay(attempt, base_delay, max_delay), min(retry_after(error) or 0.0, max_delay))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    ``before_call`` raises ``CircuitOpenError`` for ``reset_timeout``
+    seconds. Then a single trial call is let through: success closes the
+    circuit, failure opens it again. A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial_in_flight or self.clock() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` unless a call may go to the upstream now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - self.clock()
+            if remaining <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError('Upstream is unavailable', retry_after=max(remaining, 1.0))
+
+    def cancel_call(self) -> None:
+        """Forget a call let through by ``before_call`` that never reached the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            trial = self._trial_in_flight
+            self._trial_in_flight = False
+            if trial or (0 < self.failure_threshold <= self.failures):
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive upstream failures")
+                self._opened_at = self.clock()
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+
+    Callers that arrive while a call for the same key is running wait for
+    it and receive its result or exception instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Return ``(result, shared)``, where ``shared`` is True if another caller's call was reused."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Event-loop counterpart of ``SingleFlight`` for coroutines.
+
+    If the leading call is cancelled (its client went away), one of the
+    waiting callers runs the call again instead of failing with it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Any] = {}
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return ``(result, shared)``, where ``shared`` is True if another caller's call was reused."""
+        import asyncio  # Only the ASGI entry point needs it, and has it loaded already
+
+        while key in self._calls:
+            future = self._calls[key]
+            try:
+                # Shielded, so a waiter that is cancelled does not cancel the call
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue
+                raise
+            self.shared += 1
+            return result, True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved, so a call nobody waited for is not logged again
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
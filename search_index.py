@@ -0,0 +1,199 @@
+"""
+Full-text search over the chapters of one book.
+
+The index maps each term to a postings list of the chapters it occurs in
+and its word positions there. Postings are stored as delta-encoded
+varints, so a dense list of small gaps takes about one byte per position.
+Chapters are ranked with BM25, and chapters that contain the query as a
+phrase rank above those that only contain its words.
+"""
+
+import html
+import json
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+# Markup whose text is never shown to the reader
+HIDDEN_PATTERN = re.compile(r'<(head|script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Positions returned per hit; a common word can occur hundreds of times
+MAX_POSITIONS = 50
+
+TERMS_MEMBER = 'terms.json'
+POSTINGS_MEMBER = 'postings.bin'
+
+
+def html_to_text(content: str) -> str:
+    """Reduce chapter HTML to the text a reader sees; plain text passes through unchanged."""
+    if '<' not in content:
+        return content
+    return html.unescape(TAG_PATTERN.sub(' ', HIDDEN_PATTERN.sub(' ', content)))
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int]]:
+    """Yield ``(term, char_offset)`` for every word in ``text``."""
+    for match in TOKEN_PATTERN.finditer(text):
+        yield match.group().lower(), match.start()
+
+
+def encode_varints(numbers: Iterable[int]) -> bytes:
+    out = bytearray()
+    for n in numbers:
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    numbers = []
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(n)
+            n = shift = 0
+    return numbers
+
+
+def make_snippet(text: str, offset: int, width: int = 80) -> str:
+    """Return about ``2 * width`` characters of ``text`` around ``offset``, on word boundaries."""
+    start = max(0, offset - width)
+    end = min(len(text), offset + width)
+    if start > 0:
+        space = text.find(' ', start, offset)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(' ', offset, end)
+        end = space if space > offset else end
+    snippet = ' '.join(text[start:end].split())
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+
+class SearchIndex:
+    """
+    Inverted index over a book's chapters.
+
+    ``terms`` maps a term to ``(offset, length, chapter_count)`` of its
+    postings in ``postings``; ``lengths`` holds each chapter's word count.
+    A term's postings are the chapter count followed, per chapter, by the
+    chapter index gap, the number of positions and the position gaps.
+    """
+
+    def __init__(self, terms: Dict[str, Tuple[int, int, int]], postings: bytes, lengths: List[int]):
+        self.terms = terms
+        self.postings = postings
+        self.lengths = lengths
+
+    @classmethod
+    def build(cls, chapters: Iterable[Dict[str, str]]) -> 'SearchIndex':
+        occurrences: Dict[str, Dict[int, List[int]]] = {}
+        lengths = []
+        for index, chapter in enumerate(chapters):
+            position = -1
+            for position, (term, _) in enumerate(tokenize(html_to_text(chapter['content']))):
+                occurrences.setdefault(term, {}).setdefault(index, []).append(position)
+            lengths.append(position + 1)
+
+        terms = {}
+        postings = bytearray()
+        for term in sorted(occurrences):
+            chapters_with_term = occurrences[term]
+            numbers = [len(chapters_with_term)]
+            previous_chapter = 0
+            for index, positions in chapters_with_term.items():
+                numbers += [index - previous_chapter, len(positions)]
+                numbers += [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+                previous_chapter = index
+            encoded = encode_varints(numbers)
+            terms[term] = (len(postings), len(encoded), len(chapters_with_term))
+            postings += encoded
+        return cls(terms, bytes(postings), lengths)
+
+    def to_members(self) -> Dict[str, bytes]:
+        """Serialize the index as named blobs for storage alongside the book."""
+        terms = json.dumps({'lengths': self.lengths, 'terms': self.terms}, separators=(',', ':'))
+        return {TERMS_MEMBER: terms.encode('utf-8'), POSTINGS_MEMBER: self.postings}
+
+    @classmethod
+    def from_members(cls, members: Dict[str, bytes]) -> 'SearchIndex':
+        data = json.loads(members[TERMS_MEMBER])
+        terms = {term: tuple(entry) for term, entry in data['terms'].items()}
+        return cls(terms, members[POSTINGS_MEMBER], data['lengths'])
+
+    def lookup(self, term: str) -> Dict[int, List[int]]:
+        """Return ``{chapter_index: positions}`` for one term."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return {}
+        offset, length, _ = entry
+        numbers = decode_varints(self.postings[offset:offset + length])
+        result = {}
+        i = 1
+        index = 0
+        for _ in range(numbers[0]):
+            index += numbers[i]
+            count = numbers[i + 1]
+            positions = numbers[i + 2:i + 2 + count]
+            for j in range(1, count):
+                positions[j] += positions[j - 1]
+            result[index] = positions
+            i += 2 + count
+        return result
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, object]]:
+        """
+        Rank chapters for ``query``.
+
+        Returns up to ``limit`` hits of ``{'index', 'score', 'phrase',
+        'positions'}``, where ``positions`` are word offsets of phrase
+        matches, or of any query word if the phrase does not occur.
+        """
+        query_terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        if not query_terms or not self.lengths:
+            return []
+        postings = {term: self.lookup(term) for term in query_terms}
+        average_length = sum(self.lengths) / len(self.lengths) or 1
+        chapter_count = len(self.lengths)
+
+        scores: Dict[int, float] = {}
+        for term, chapters in postings.items():
+            idf = math.log(1 + (chapter_count - len(chapters) + 0.5) / (len(chapters) + 0.5))
+            for index, positions in chapters.items():
+                tf = len(positions)
+                norm = K1 * (1 - B + B * self.lengths[index] / average_length)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        phrase_terms = [term for term, _ in tokenize(query)]
+        hits = []
+        for index, score in scores.items():
+            phrase = self._phrase_positions(phrase_terms, postings, index) if len(phrase_terms) > 1 else []
+            if phrase:
+                positions = phrase
+            else:
+                positions = sorted(p for chapters in postings.values() for p in chapters.get(index, ()))
+            hits.append({'index': index, 'score': round(score, 4), 'phrase': bool(phrase),
+                         'positions': positions[:MAX_POSITIONS]})
+        hits.sort(key=lambda hit: (hit['phrase'], hit['score']), reverse=True)
+        return hits[:limit]
+
+    @staticmethod
+    def _phrase_positions(phrase_terms: List[str], postings: Dict[str, Dict[int, List[int]]],
+                          index: int) -> List[int]:
+        candidates = set(postings[phrase_terms[0]].get(index, ()))
+        for offset, term in enumerate(phrase_terms[1:], start=1):
+            following = postings[term].get(index)
+            if not following:
+                return []
+            following = set(following)
+            candidates = {p for p in candidates if p + offset in following}
+        return sorted(candidates)
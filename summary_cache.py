@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_summary_key(content: str, model: str, max_tokens: int, temperature: float,
+                     strategy: str = 'truncate') -> str:
+    """Hash the exact model input and the parameters that influence the output."""
+    digest = hashlib.sha256()
+    for part in (strategy, model, str(max_tokens), repr(float(temperature)), content):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: an in-process LRU in front of a SQLite table.
+
+    Entries expire ``ttl`` seconds after they were generated. The SQLite tier
+    holds at most ``max_entries`` rows and drops the least recently read ones
+    first, so it can be shared by several worker processes. Expired and
+    surplus rows are swept every ``evict_every`` writes rather than on each
+    one, so the table can briefly hold that many rows over the limit.
+
+    The LRU and the SQLite connection have separate locks: a hit in memory
+    never waits for a write or a sweep.
+    """
+
+    # Disk hits record their read time in batches of this many, or with the
+    # next write, instead of committing an UPDATE per read
+    ACCESS_BATCH = 64
+
+    def __init__(self, path: str, ttl: float, max_entries: int, memory_entries: int, evict_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.evict_every = max(1, evict_every)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._memory_lock = threading.Lock()
+        # Guards the connection, the pending read times and the write counter
+        self._db_lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._writes = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            ' key TEXT PRIMARY KEY, summary TEXT NOT NULL,'
+            ' created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS summaries_created ON summaries (created)')
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached summary, or None if missing or expired."""
+        now = time.time()
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                summary, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return summary
+                del self._memory[key]
+
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    'SELECT summary, created FROM summaries WHERE key = ? AND created > ?',
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    self._accessed[key] = now
+                    if len(self._accessed) >= self.ACCESS_BATCH:
+                        self._flush_accessed()
+                        self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading summary cache: {e}")
+            row = None
+
+        with self._memory_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key: str, summary: str) -> None:
+        """Store a summary in both tiers, sweeping the SQLite tier every ``evict_every`` writes."""
+        now = time.time()
+        with self._memory_lock:
+            self._remember(key, summary, now)
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO summaries (key, summary, created, accessed) VALUES (?, ?, ?, ?)',
+                    (key, summary, now, now)
+                )
+                self._accessed.pop(key, None)
+                self._writes += 1
+                # Eviction orders by read time, so record pending reads first
+                self._flush_accessed()
+                if self._writes % self.evict_every == 0:
+                    self._evict(now)
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing summary cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current usage."""
+        with self._db_lock:
+            try:
+                entries = self._db.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+            except sqlite3.Error:
+                entries = -1
+        with self._memory_lock:
+            return {
+                'hits': self.memory_hits + self.disk_hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'entries': entries,
+                'max_entries': self.max_entries,
+            }
+
+    def _remember(self, key: str, summary: str, created: float) -> None:
+        self._memory[key] = (summary, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_accessed(self) -> None:
+        """Write pending read times; the caller holds ``_db_lock`` and commits."""
+        if self._accessed:
+            pending, self._accessed = self._accessed, {}
+            self._db.executemany('UPDATE summaries SET accessed = ? WHERE key = ?',
+                                 [(accessed, key) for key, accessed in pending.items()])
+
+    def _evict(self, now: float) -> None:
+        """Drop expired rows, then the least recently read rows over the limit; both walk the table."""
+        self._db.execute('DELETE FROM summaries WHERE created <= ?', (now - self.ttl,))
+        self._db.execute(
+            'DELETE FROM summaries WHERE key IN ('
+            ' SELECT key FROM summaries ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
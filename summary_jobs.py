@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from resilience import UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Summarizes one chapter, returning (summary, cached)
+SummarizeFn = Callable[[str], Tuple[str, bool]]
+# Loads the content of one chapter by index
+LoadChapterFn = Callable[[int], Optional[str]]
+
+
+class SummaryJob:
+    """Progress and results of summarizing every chapter of one book."""
+
+    def __init__(self, book_id: str, total: int):
+        self.id = uuid.uuid4().hex
+        self.book_id = book_id
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.cached = 0
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.results: List[Optional[str]] = [None] * total
+        self.errors: Dict[int, str] = {}
+
+    @property
+    def status(self) -> str:
+        if self.finished is not None:
+            return 'completed'
+        return 'running' if self.completed or self.failed else 'queued'
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'book_id': self.book_id,
+            'status': self.status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cached': self.cached,
+            'results': self.results,
+            'errors': {str(index): error for index, error in self.errors.items()},
+        }
+
+
+class SummaryJobQueue:
+    """
+    Summarizes whole books in the background on a shared thread pool.
+
+    Chapters from all jobs are queued on the same pool in submission order,
+    so at most ``workers`` chapters are summarized at once. A long chapter
+    is summarized map-reduce with its own ``max_concurrency`` requests in
+    flight, so up to ``workers * max_concurrency`` upstream calls can run
+    at once; their rate is paced by the shared OpenAI request budget.
+    Jobs live in memory; the oldest finished jobs are forgotten once more
+    than ``max_jobs`` are tracked.
+    """
+
+    def __init__(self, workers: int, summarize: SummarizeFn, max_jobs: int = 100):
+        self.summarize = summarize
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary-job')
+        self._jobs: 'OrderedDict[str, SummaryJob]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, book_id: str, chapter_count: int, load_chapter: LoadChapterFn) -> SummaryJob:
+        """Queue every chapter of a book, reusing an unfinished job for the same book."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.book_id == book_id and job.finished is None:
+                    return job
+            job = SummaryJob(book_id, chapter_count)
+            self._jobs[job.id] = job
+            self._prune()
+
+        for index in range(chapter_count):
+            self._executor.submit(self._run, job, index, load_chapter)
+        if chapter_count == 0:
+            job.finished = time.time()
+        return job
+
+    def get(self, job_id: str) -> Optional[SummaryJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: SummaryJob, index: int, load_chapter: LoadChapterFn) -> None:
+        summary = None
+        error = None
+        cached = False
+        try:
+            content = load_chapter(index)
+            if content is None:
+                error = 'Chapter not found'
+            else:
+                summary, cached = self.summarize(content)
+        except (ValueError, UpstreamUnavailableError) as e:
+            error = str(e)
+        except Exception as e:
+            logger.warning(f"Error summarizing chapter {index} of book {job.book_id}: {e}")
+            error = 'Internal server error'
+
+        with self._lock:
+            if error is None:
+                job.results[index] = summary
+                job.completed += 1
+                job.cached += cached
+            else:
+                job.errors[index] = error
+                job.failed += 1
+            if job.completed + job.failed == job.total:
+                job.finished = time.time()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
@@ -0,0 +1,40 @@
+"""
+Drive an ASGI application in-process, without a network server.
+"""
+
+import asyncio
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+async def call(application: Callable, method: str, path: str, payload: Optional[Dict] = None,
+               headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one request straight into ``application`` and return (status, headers, body)."""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    request_headers = [(b'content-type', b'application/json')] if payload is not None else []
+    scope = {'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': request_headers + (headers or []), 'client': ('127.0.0.1', 0),
+             'server': ('127.0.0.1', 80), 'scheme': 'http', 'http_version': '1.1', 'root_path': ''}
+    sent = False
+    status = None
+    response_headers: Dict[str, str] = {}
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # Nothing more to read; wait like a client that keeps the connection open
+            await asyncio.sleep(3600)
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            response_headers.update((k.decode('latin-1'), v.decode('latin-1')) for k, v in message['headers'])
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return status, response_headers, b''.join(chunks)
@@ -0,0 +1,80 @@
+"""
+Helpers for building small synthetic books in tests.
+"""
+
+import io
+import mimetypes
+import textwrap
+from typing import Dict, List, Optional
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from ebooklib import epub
+
+LOREM = (
+    "The reader turned the page and the lamp flickered while the story went on. "
+    "Every chapter carried a little more of the plot forward toward its end. "
+)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Build a PDF with one page per string, using the standard Helvetica font."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        lines = textwrap.wrap(text, 90) or ['']
+        ops = ['BT', '/F1 11 Tf', '14 TL', '72 740 Td']
+        ops += [f'({_pdf_escape(line)}) Tj T*' for line in lines]
+        ops.append('ET')
+        stream = DecodedStreamObject()
+        stream.set_data('\n'.join(ops).encode('latin-1'))
+        page[NameObject('/Contents')] = writer._add_object(stream)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+        })
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def make_epub(chapters: List[str], title: str = 'Synthetic Book',
+              assets: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Build an EPUB with one XHTML document per chapter body.
+
+    ``assets`` maps file names such as ``images/cover.png`` to resources
+    added to the manifest but not the spine.
+    """
+    book = epub.EpubBook()
+    book.set_identifier(f'synthetic-{len(chapters)}')
+    book.set_title(title)
+    book.set_language('en')
+    items = []
+    for i, body in enumerate(chapters):
+        item = epub.EpubHtml(title=f'Chapter {i + 1}', file_name=f'chap_{i + 1:04d}.xhtml', lang='en')
+        item.content = f'<html><body><h1>Chapter {i + 1}</h1><p>{body}</p></body></html>'
+        book.add_item(item)
+        items.append(item)
+    for i, (file_name, content) in enumerate((assets or {}).items()):
+        media_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+        book.add_item(epub.EpubItem(uid=f'asset_{i}', file_name=file_name, media_type=media_type, content=content))
+    book.toc = items
+    book.spine = items
+    book.add_item(epub.EpubNcx())
+    buffer = io.BytesIO()
+    epub.write_epub(buffer, book)
+    return buffer.getvalue()
+
+
+def sample_text(n: int, repeat: int = 3) -> str:
+    """Deterministic prose for page or chapter number ``n``."""
+    return f"Section {n}. " + LOREM * repeat
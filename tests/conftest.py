@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Keep caches written during tests out of the working tree. This must run
+# before the app module is imported by any test.
+os.environ.setdefault('CACHE_FOLDER', tempfile.mkdtemp(prefix='book_reader_test_cache_'))
+# Tests that exercise request pacing construct their own budgets
+os.environ.setdefault('OPENAI_REQUESTS_PER_MINUTE', '0')
+# Likewise for per-client rate limits; every test client shares 127.0.0.1
+os.environ.setdefault('RATE_LIMIT_REQUESTS', '100000')
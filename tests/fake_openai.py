@@ -0,0 +1,138 @@
+"""
+A local, OpenAI-compatible chat completions server for tests and benchmarks.
+
+Point a client at it with ``openai.OpenAI(api_key='dummy', base_url=server.base_url)``.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+
+def default_reply(messages: List[dict]) -> str:
+    prompt = messages[-1]['content']
+    return f"Summary of {len(prompt)} characters."
+
+
+class FakeOpenAIServer:
+    """
+    Serve ``/v1/chat/completions`` with a fixed latency.
+
+    ``reply`` maps the request messages to the completion text. ``failures``
+    makes the first N requests answer with ``failure_status``. The server
+    records how many requests it saw and the peak number handled at once.
+    """
+
+    def __init__(self, latency: float = 0.0, reply: Callable[[List[dict]], str] = default_reply,
+                 failures: int = 0, failure_status: int = 500):
+        self.latency = latency
+        self.reply = reply
+        self.failures = failures
+        self.failure_status = failure_status
+        self.requests: List[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'FakeOpenAIServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                server._handle(self, body)
+
+        self._httpd = _Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self) -> 'FakeOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: dict) -> None:
+        with self._lock:
+            self.requests.append(body)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        try:
+            time.sleep(self.latency)
+            if fail:
+                error = {'message': 'injected failure', 'type': 'server_error'}
+                self._send_json(handler, self.failure_status, {'error': error})
+            elif body.get('stream'):
+                self._send_stream(handler, body)
+            else:
+                self._send_json(handler, 200, self._completion(body))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _completion(self, body: dict) -> dict:
+        text = self.reply(body.get('messages', []))
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': text}}],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': len(text.split()), 'total_tokens': 10 + len(text.split())},
+        }
+
+    def _send_json(self, handler: BaseHTTPRequestHandler, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _send_stream(self, handler: BaseHTTPRequestHandler, body: dict) -> None:
+        text = self.reply(body.get('messages', []))
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        for word in text.split(' '):
+            chunk = {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': body.get('model', 'fake'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+            }
+            handler.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+            handler.wfile.flush()
+        handler.wfile.write(b'data: [DONE]\n\n')
+        handler.wfile.flush()
+        handler.close_connection = True
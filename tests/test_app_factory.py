@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app import app, create_app, get_state
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAPTER = ('The storm reached the harbour town at dusk. Fishermen dragged their boats above the tide line. '
+           'By midnight the storm had torn the roof from the harbour master\'s house.')
+
+
+class AppFactoryTests(unittest.TestCase):
+    def test_apps_have_their_own_configuration_and_state(self):
+        with tempfile.TemporaryDirectory() as cache:
+            other = create_app({'CACHE_FOLDER': cache, 'RATE_LIMIT': {'requests': 1, 'window': 3600}}, testing=True)
+            client = other.test_client()
+            self.assertEqual(client.get('/').status_code, 200)
+            self.assertEqual(client.get('/').status_code, 429)
+            # The module-level app keeps its own limiter, caches and metrics
+            self.assertEqual(app.test_client().get('/').status_code, 200)
+            self.assertIsNot(get_state(other).book_store, get_state(app).book_store)
+            self.assertTrue(os.path.exists(os.path.join(cache, 'ratelimit.sqlite3')))
+
+    def test_import_is_light_and_works_without_an_api_key(self):
+        # A fresh interpreter, since this one has long imported everything
+        code = '\n'.join([
+            'import json, sys',
+            'import app',
+            "heavy = [name for name in ('openai', 'pypdf', 'numpy') if name in sys.modules]",
+            'client = app.app.test_client()',
+            "summary = client.post('/summarize', json={'content': sys.argv[1]})",
+            "print(json.dumps({'heavy': heavy, 'status': client.get('/').status_code,",
+            "                  'engine': summary.get_json().get('engine')}))",
+        ])
+        with tempfile.TemporaryDirectory() as cache:
+            env = {key: value for key, value in os.environ.items() if key != 'OPENAI_API_KEY'}
+            env['CACHE_FOLDER'] = cache
+            output = subprocess.run([sys.executable, '-c', code, CHAPTER], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(result['heavy'], [])
+        self.assertEqual(result['status'], 200)
+        # Without a key the model cannot be called, so the extractive engine answers
+        self.assertEqual(result['engine'], 'extractive')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+import openai
+
+import asgi
+from app import app, get_state
+from fake_openai import FakeOpenAIServer
+from asgi_client import call
+from resilience import CircuitBreaker
+
+
+class AsgiSummarizeTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenAIServer(latency=0.5).start()
+        self.addCleanup(self.server.stop)
+        asgi.async_client = openai.AsyncOpenAI(api_key='dummy_key_for_testing', base_url=self.server.base_url,
+                                               max_retries=0)
+        self.addCleanup(setattr, asgi, 'async_client', None)
+
+    def test_hundreds_of_summaries_in_flight_on_one_event_loop(self):
+        async def burst():
+            return await asyncio.gather(*(
+                call(asgi.application, 'POST', '/summarize',
+                     {'content': f'Concurrent chapter number {i} with enough text to summarize.'})
+                for i in range(200)
+            ))
+
+        start = time.perf_counter()
+        responses = asyncio.run(burst())
+        elapsed = time.perf_counter() - start
+
+        self.assertTrue(all(status == 200 for status, _, _ in responses))
+        self.assertGreaterEqual(self.server.max_in_flight, 100)
+        # Sequential handling would take 200 * 0.5s
+        self.assertLess(elapsed, 10)
+
+    def test_summary_response_matches_flask_view(self):
+        payload = {'content': 'An async chapter summarized once and then served from the cache.'}
+        status, headers, body = asyncio.run(call(asgi.application, 'POST', '/summarize', payload))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['x-content-type-options'], 'nosniff')
+        self.assertIn('x-ratelimit-remaining', headers)
+        self.assertRegex(headers['server-timing'], r'^cache;dur=[\d.]+, openai;dur=[\d.]+, total;dur=')
+        data = json.loads(body)
+        self.assertTrue(data['summary'].startswith('Summary of'))
+        self.assertFalse(data['cached'])
+
+        status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize', payload))
+        self.assertTrue(json.loads(body)['cached'])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_summary_response_is_compressed_when_accepted(self):
+        payload = {'content': 'An async chapter whose summary is sent gzip compressed.'}
+        with patch.dict(app.config['COMPRESSION'], {'min_bytes': 0}):
+            status, headers, body = asyncio.run(call(asgi.application, 'POST', '/summarize', payload,
+                                                     headers=[(b'accept-encoding', b'gzip')]))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-encoding'], 'gzip')
+        self.assertEqual(headers['content-length'], str(len(body)))
+        self.assertIn('summary', json.loads(gzip.decompress(body)))
+
+    def test_stream_forwards_tokens(self):
+        status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize/stream',
+                                           {'content': 'A streamed async chapter with some text.'}))
+        self.assertEqual(status, 200)
+        self.assertIn(b'event: token', body)
+        self.assertIn(b'event: done', body)
+
+    def test_identical_concurrent_requests_share_one_model_call(self):
+        content = f'A chapter the whole class opens at once on the async server {time.time_ns()}.'
+
+        async def burst():
+            summaries = [call(asgi.application, 'POST', '/summarize', {'content': content}) for _ in range(15)]
+            streams = [call(asgi.application, 'POST', '/summarize/stream', {'content': content}) for _ in range(5)]
+            return await asyncio.gather(*summaries, *streams)
+
+        responses = asyncio.run(burst())
+        self.assertTrue(all(status == 200 for status, _, _ in responses))
+        self.assertEqual(len(self.server.requests), 1)
+        summaries = [json.loads(body) for _, _, body in responses[:15]]
+        self.assertEqual(len({data['summary'] for data in summaries}), 1)
+        self.assertGreaterEqual(sum(data['cached'] for data in summaries), 14)
+        for _, _, body in responses[15:]:
+            self.assertIn(b'event: token', body)
+            self.assertIn(b'event: done', body)
+
+    def test_each_retry_draws_from_the_budget(self):
+        self.server.latency = 0
+        self.server.failures = 2
+        self.server.failure_status = 429
+        state = get_state(app)
+        acquired = []
+        acquire_async = state.openai_budget.acquire_async
+
+        async def counting_acquire(timeout=None):
+            acquired.append(1)
+            return await acquire_async(timeout)
+
+        payload = {'content': f'An async chapter that is throttled twice {time.time_ns()}.'}
+        with patch.dict(app.config['OPENAI_RETRY'], {'attempts': 3, 'base_delay': 0.01, 'max_delay': 0.05}), \
+                patch.object(state.openai_budget, 'acquire_async', counting_acquire):
+            status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize', payload))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['engine'], 'remote')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(acquired), 3)
+
+    def test_each_failed_attempt_counts_toward_opening_the_circuit(self):
+        self.server.latency = 0
+        self.server.failures = 100
+        state = get_state(app)
+        payload = {'content': f'An async chapter sent while the API is down {time.time_ns()}.'}
+        with patch.dict(app.config['OPENAI_RETRY'], {'attempts': 3, 'base_delay': 0.01, 'max_delay': 0.05}), \
+                patch.dict(app.config['SUMMARY'], {'fallback': False}), \
+                patch.object(state, 'openai_breaker', CircuitBreaker(failure_threshold=2, reset_timeout=30)):
+            status, headers, _ = asyncio.run(call(asgi.application, 'POST', '/summarize', payload))
+        self.assertEqual(status, 503)
+        self.assertEqual(headers['retry-after'], '30')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_interactive_summaries_fall_back_at_the_deadline(self):
+        self.server.latency = 2.0
+        payload = {'content': f'An async chapter the model is too slow for. It has two sentences {time.time_ns()}.'}
+        with patch.dict(app.config['SUMMARY'], {'fallback': True, 'fallback_after': 0.5}):
+            start = time.perf_counter()
+            status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize', payload))
+            elapsed = time.perf_counter() - start
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['engine'], 'extractive')
+        self.assertLess(elapsed, 1.5)
+
+    def test_validation_errors_are_json(self):
+        status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize', {'content': 'short'}))
+        self.assertEqual(status, 400)
+        self.assertIn('error', json.loads(body))
+
+    def test_other_routes_fall_through_to_flask(self):
+        status, _, body = asyncio.run(call(asgi.application, 'GET', '/'))
+        self.assertEqual(status, 200)
+        self.assertIn(b'Book Reader', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import hashlib
+import io
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import app, get_state
+from book_store import BookStore
+from book_factory import make_pdf, make_epub, sample_text
+
+
+class BookStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_round_trip_counts_hits_and_misses(self):
+        store = BookStore(self.tmpdir.name, max_bytes=10 * 1024 * 1024)
+        chapters = [{'title': 'One', 'content': 'First chapter'}, {'title': 'Two', 'content': 'Zweites Kapitel ü'}]
+
+        self.assertIsNone(store.get('a' * 64))
+        store.put('a' * 64, chapters)
+        self.assertEqual(store.get('a' * 64), chapters)
+
+        stats = store.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_least_recently_used_book_is_evicted(self):
+        chapters = [{'title': 'Page', 'content': sample_text(1, repeat=50)}]
+        probe = BookStore(self.tmpdir.name + '/probe', max_bytes=10 ** 9)
+        probe.put('0' * 64, chapters)
+        entry_size = probe.total_bytes
+
+        store = BookStore(self.tmpdir.name + '/store', max_bytes=entry_size * 2)
+        store.put('a' * 64, chapters)
+        store.put('b' * 64, chapters)
+        store.get('a' * 64)  # 'b' is now least recently used
+        store.put('c' * 64, chapters)
+
+        self.assertIn('a' * 64, store)
+        self.assertNotIn('b' * 64, store)
+        self.assertIn('c' * 64, store)
+        self.assertEqual(store.stats()['evictions'], 1)
+
+    def test_index_survives_restart(self):
+        store = BookStore(self.tmpdir.name, max_bytes=10 * 1024 * 1024)
+        store.put('a' * 64, [{'title': 'One', 'content': 'Body'}])
+
+        reopened = BookStore(self.tmpdir.name, max_bytes=10 * 1024 * 1024)
+        self.assertEqual(reopened.stats()['entries'], 1)
+        self.assertEqual(reopened.get('a' * 64), [{'title': 'One', 'content': 'Body'}])
+
+
+class UploadCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload(self, data: bytes, filename: str):
+        return self.client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                                content_type='multipart/form-data')
+
+    def test_reupload_skips_pdf_extraction(self):
+        pdf = make_pdf([sample_text(i) + ' cache-pdf' for i in range(3)])
+
+        first = self._upload(pdf, 'book.pdf')
+        self.assertEqual(first.status_code, 200)
+
+        with patch('app.extract_chapters_pdf', side_effect=AssertionError('should not parse')):
+            second = self._upload(pdf, 'renamed.pdf')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.get_json(), second.get_json())
+
+    def test_reupload_skips_epub_extraction(self):
+        book = make_epub([sample_text(i) + ' cache-epub' for i in range(2)])
+
+        first = self._upload(book, 'book.epub')
+        self.assertEqual(first.status_code, 200)
+
+        hits_before = get_state(app).book_store.stats()['hits']
+        with patch('app.extract_chapters_epub', side_effect=AssertionError('should not parse')):
+            second = self._upload(book, 'book.epub')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(get_state(app).book_store.stats()['hits'], hits_before + 1)
+
+    def test_book_id_is_the_sha256_of_the_file(self):
+        # The browser hashes a file itself to find the book in IndexedDB and skip the upload
+        book = make_epub([sample_text(i) + ' cache-id' for i in range(2)])
+        response = self._upload(book, 'book.epub')
+        self.assertEqual(response.get_json()['book_id'], hashlib.sha256(book).hexdigest())
+        self.assertEqual(self.client.get(f"/books/{hashlib.sha256(book).hexdigest()}").status_code, 200)
+
+    def test_stats_endpoint_reports_book_cache(self):
+        response = self.client.get('/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.get_json()['book_cache'])
+        self.assertIn('misses', response.get_json()['book_cache'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import gzip
+import io
+import unittest
+
+import compression
+from app import app, get_state, summary_cache_key
+from book_factory import make_epub, sample_text
+
+
+class CompressionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        book = make_epub([sample_text(i, repeat=40) + ' compress-me' for i in range(2)] + ['Tiny'])
+        response = app.test_client().post('/upload', data={'file': (io.BytesIO(book), 'book.epub')},
+                                          content_type='multipart/form-data')
+        cls.book_id = response.get_json()['book_id']
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_large_json_is_gzipped_when_accepted(self):
+        url = f'/books/{self.book_id}/chapters/0'
+        plain = self.client.get(url)
+        compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertLess(len(compressed.data), len(plain.data) / 3)
+
+    def test_small_and_streamed_responses_are_left_alone(self):
+        small = self.client.get(f'/books/{self.book_id}/chapters/2', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+
+        stream = self.client.post('/upload?stream=1', headers={'Accept-Encoding': 'gzip'},
+                                  data={'file': (io.BytesIO(make_epub([sample_text(0, repeat=40)])), 'book.epub')},
+                                  content_type='multipart/form-data')
+        self.assertNotIn('Content-Encoding', stream.headers)
+
+    def test_brotli_is_preferred_when_available(self):
+        if compression.brotli is None:
+            self.assertEqual(compression.choose_encoding('br, gzip'), 'gzip')
+            return
+        response = self.client.get(f'/books/{self.book_id}/chapters/0', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+
+    def test_identity_only_clients_get_plain_bodies(self):
+        self.assertIsNone(compression.choose_encoding('identity'))
+        self.assertIsNone(compression.choose_encoding('gzip;q=0'))
+        self.assertIsNone(compression.choose_encoding(None))
+
+
+class ConditionalGetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        book = make_epub([sample_text(i) + ' conditional' for i in range(2)])
+        response = app.test_client().post('/upload', data={'file': (io.BytesIO(book), 'book.epub')},
+                                          content_type='multipart/form-data')
+        cls.book_id = response.get_json()['book_id']
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def assertRevalidates(self, url):
+        first = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first.status_code, 200)
+        etag, weak = first.get_etag()
+        self.assertTrue(weak)
+        self.assertTrue(first.cache_control.no_cache)
+
+        second = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+        changed = self.client.get(url, headers={'If-None-Match': 'W/"something-else"'})
+        self.assertEqual(changed.status_code, 200)
+
+    def test_book_and_chapter_responses_revalidate(self):
+        self.assertRevalidates(f'/books/{self.book_id}')
+        self.assertRevalidates(f'/books/{self.book_id}/chapters/1')
+
+    def test_cached_summary_responses_revalidate(self):
+        content = self.client.get(f'/books/{self.book_id}/chapters/0').get_json()['content']
+        with app.app_context():
+            get_state().summary_cache.set(summary_cache_key(content, 'truncate'), 'A stored summary.')
+        self.assertRevalidates(f'/books/{self.book_id}/chapters/0/summary')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import os
+import unittest
+
+from app import app
+from book_factory import make_epub, sample_text
+
+
+class EpubAssetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.image = os.urandom(4096)
+        cls.css = b'p { color: #333; }'
+        book = make_epub(
+            [sample_text(0) + ' <img src="images/plate%201.png" alt="Plate"/> <a href="https://example.com/a.png">x</a>',
+             sample_text(1) + ' assets-second'],
+            assets={'images/plate 1.png': cls.image, 'style.css': cls.css}
+        )
+        client = app.test_client()
+        response = client.post('/upload', data={'file': (io.BytesIO(book), 'book.epub')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        cls.book_id = response.get_json()['book_id']
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_chapter_links_point_at_the_asset_endpoint(self):
+        content = self.client.get(f'/books/{self.book_id}/chapters/0').get_json()['content']
+        self.assertIn(f'src="/books/{self.book_id}/assets/images/plate%201.png"', content)
+        self.assertIn('href="https://example.com/a.png"', content)
+
+    def test_asset_is_served_with_strong_etag_and_long_cache_lifetime(self):
+        response = self.client.get(f'/books/{self.book_id}/assets/images/plate%201.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.image)
+        self.assertEqual(response.mimetype, 'image/png')
+        etag, weak = response.get_etag()
+        self.assertTrue(etag)
+        self.assertFalse(weak)
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 3600)
+        self.assertTrue(response.cache_control.public)
+        self.assertTrue(response.cache_control.immutable)
+
+        css = self.client.get(f'/books/{self.book_id}/assets/style.css')
+        self.assertEqual(css.data, self.css)
+        self.assertEqual(css.mimetype, 'text/css')
+
+    def test_conditional_and_range_requests(self):
+        url = f'/books/{self.book_id}/assets/images/plate%201.png'
+        etag = self.client.get(url).get_etag()[0]
+
+        not_modified = self.client.get(url, headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+
+        partial = self.client.get(url, headers={'Range': 'bytes=100-199'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.data, self.image[100:200])
+        self.assertEqual(partial.headers['Content-Range'], f'bytes 100-199/{len(self.image)}')
+
+    def test_unknown_assets_are_not_found(self):
+        for path in ('images/missing.png', '../manifest.json', 'chapters/0'):
+            self.assertEqual(self.client.get(f'/books/{self.book_id}/assets/{path}').status_code, 404)
+        self.assertEqual(self.client.get(f"/books/{'0' * 64}/assets/style.css").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from app import app, extract_chapters_epub
+from book_factory import make_epub, sample_text
+
+
+def rewrite_member(book: bytes, name: str, edit) -> bytes:
+    """Return a copy of an EPUB archive with one member's text transformed by ``edit``."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(book)) as src, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == name:
+                data = edit(data.decode('utf-8')).encode('utf-8')
+            dst.writestr(info, data)
+    return out.getvalue()
+
+
+class EpubExtractionTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        # The extractors read their limits from the current app
+        context = app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_documents_follow_spine_order(self):
+        book = make_epub([sample_text(i) for i in range(3)])
+        reordered = rewrite_member(book, 'EPUB/content.opf', lambda opf: opf.replace(
+            '<itemref idref="chapter_0"/>', '').replace('</spine>', '<itemref idref="chapter_0"/></spine>'))
+
+        titles = [chapter['title'] for chapter in extract_chapters_epub(io.BytesIO(reordered))]
+        self.assertEqual(titles, ['chap_0002.xhtml', 'chap_0003.xhtml', 'chap_0001.xhtml'])
+
+    def test_resources_are_not_decompressed(self):
+        # Incompressible images make up almost all of the archive
+        assets = {f'images/plate_{i}.png': os.urandom(512 * 1024) for i in range(32)}
+        chapters = [sample_text(i, repeat=20) for i in range(5)]
+        fd, path = tempfile.mkstemp(suffix='.epub')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_epub(chapters, assets=assets))
+        self.assertGreater(os.path.getsize(path), 16 * 1024 * 1024)
+
+        tracemalloc.start()
+        try:
+            extracted = list(extract_chapters_epub(path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(len(extracted), 5)
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_member_count_limit(self):
+        book = make_epub(['One', 'Two'], assets={f'styles/{i}.css': b'p {}' for i in range(20)})
+        with patch.dict(app.config, {'EPUB_MAX_MEMBERS': 10}):
+            with self.assertRaisesRegex(ValueError, 'too many entries'):
+                list(extract_chapters_epub(io.BytesIO(book)))
+
+    def test_uncompressed_size_limit_rejects_zip_bombs(self):
+        book = make_epub(['x' * (1024 * 1024)])
+        self.assertLess(len(book), 64 * 1024)
+
+        with patch.dict(app.config, {'EPUB_MAX_UNCOMPRESSED_BYTES': 256 * 1024}):
+            response = self.client.post('/upload', data={'file': (io.BytesIO(book), 'bomb.epub')},
+                                        content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'EPUB file is too large to process')
+
+    def test_package_entities_are_refused(self):
+        book = make_epub(['One', 'Two'])
+        laughs = ('<!DOCTYPE package [<!ENTITY lol "lol">'
+                  '<!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;">]>')
+        bomb = rewrite_member(book, 'EPUB/content.opf', lambda opf: opf.replace(
+            '<package', laughs + '<package', 1).replace('</metadata>', '<dc:source>&lol2;</dc:source></metadata>'))
+
+        with self.assertRaisesRegex(ValueError, 'Failed to process EPUB file'):
+            list(extract_chapters_epub(io.BytesIO(bomb)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+import asgi
+from app import app, get_state
+from asgi_client import call
+from extractive_summary import split_sentences, summarize
+
+CHAPTER = ' '.join([
+    'The storm reached the harbour town at dusk.',
+    'Fishermen dragged their boats above the tide line while the storm grew.',
+    'A cat slept on a warm windowsill.',
+    'By midnight the storm had torn the roof from the harbour master\'s house.',
+    'Nobody noticed the baker humming.',
+    'At dawn the town counted the boats the storm had taken from the harbour.',
+    'The weather vane pointed east.',
+])
+
+
+class ExtractiveSummaryTests(unittest.TestCase):
+    def test_central_sentences_are_kept_in_reading_order(self):
+        sentences = split_sentences(summarize(CHAPTER, max_sentences=3))
+        self.assertEqual(len(sentences), 3)
+        # The asides share no words with the rest of the chapter
+        for aside in ('cat', 'baker', 'weather vane'):
+            self.assertFalse(any(aside in sentence for sentence in sentences), aside)
+        self.assertEqual(sentences, sorted(sentences, key=CHAPTER.index))
+
+    def test_markup_repeats_and_fragments_are_dropped(self):
+        html = f'<html><head><title>Ch. 1</title></head><body><h1>One</h1><p>{CHAPTER}</p><p>{CHAPTER}</p></body></html>'
+        sentences = split_sentences(summarize(html, max_sentences=10))
+        self.assertEqual(len(sentences), 7)
+        self.assertNotIn('Ch', sentences[0])
+        # A title page with no full sentences summarizes to its text
+        self.assertEqual(summarize('<h1>Part One</h1>'), 'Part One')
+
+    def test_long_chapters_take_milliseconds(self):
+        chapter = ' '.join(f'Sentence {i} mentions topic{i % 97} and topic{i % 13} again.' for i in range(5000))
+        start = time.perf_counter()
+        summary = summarize(chapter)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(split_sentences(summary)), 5)
+
+
+class SummaryModeTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_extractive_mode_never_calls_the_model(self):
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=AssertionError('no model calls')):
+            response = self.client.post('/summarize', json={'content': CHAPTER, 'mode': 'extractive'})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['engine'], 'extractive')
+        self.assertFalse(data['cached'])
+        self.assertIn('storm', data['summary'])
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.post('/summarize', json={'content': CHAPTER, 'mode': 'psychic'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_model_failure_falls_back_to_extractive(self):
+        content = f'{CHAPTER} Run {time.time_ns()} ended quietly.'
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=RuntimeError('boom')):
+            response = self.client.post('/summarize', json={'content': content})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['engine'], 'extractive')
+
+        metrics = self.client.get('/metrics').get_data(as_text=True)
+        self.assertRegex(metrics, r'book_reader_summary_fallbacks_total [1-9]')
+
+    def test_asgi_route_supports_modes_and_fallback(self):
+        status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize',
+                                           {'content': CHAPTER, 'mode': 'extractive'}))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['engine'], 'extractive')
+
+        content = f'{CHAPTER} Async run {time.time_ns()} ended quietly.'
+        with patch('asgi.complete_summary', side_effect=RuntimeError('boom')):
+            status, _, body = asyncio.run(call(asgi.application, 'POST', '/summarize', {'content': content}))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['engine'], 'extractive')
+
+
+if __name__ == '__main__':
+    unittest.main()
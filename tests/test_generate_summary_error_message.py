@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch
-from app import app
+from app import app, get_state
 
 # Create a dummy exception class to simulate an OpenAI API error.
 class DummyOpenAIError(Exception):
@@ -11,6 +11,10 @@ class DummyOpenAIError(Exception):
 class TestGenerateSummaryErrorMessage(unittest.TestCase):
     def setUp(self):
         self.client = app.test_client()
+        # Without the extractive fallback the failure reaches the client
+        fallback = patch.dict(app.config['SUMMARY'], {'fallback': False})
+        fallback.start()
+        self.addCleanup(fallback.stop)
 
     def test_generate_summary_generic_error_message_is_returned(self):
         payload = {
@@ -20,7 +24,7 @@ class TestGenerateSummaryErrorMessage(unittest.TestCase):
         dummy_error_message = "Some error occurred during summary generation."
 
         # Patch the OpenAI client's chat.completions.create to simulate an error.
-        with patch("app.client.chat.completions.create", side_effect=DummyOpenAIError(dummy_error_message)):
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=DummyOpenAIError(dummy_error_message)):
             response = self.client.post('/summarize', json=payload)
             data = response.get_json()
 
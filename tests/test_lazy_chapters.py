@@ -0,0 +1,51 @@
+import io
+import unittest
+
+from app import app
+from book_factory import make_pdf, make_epub, sample_text
+
+
+class LazyChapterDeliveryTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload(self, data: bytes, filename: str):
+        return self.client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                                content_type='multipart/form-data')
+
+    def test_upload_returns_book_id_and_toc_without_content(self):
+        pages = [sample_text(i) + ' lazy-toc' for i in range(4)]
+        response = self._upload(make_pdf(pages), 'book.pdf')
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_json()
+        self.assertEqual(len(data['book_id']), 64)
+        self.assertEqual([c['title'] for c in data['chapters']], ['Page 1', 'Page 2', 'Page 3', 'Page 4'])
+        for chapter in data['chapters']:
+            self.assertNotIn('content', chapter)
+            self.assertGreater(chapter['size'], 0)
+
+    def test_chapter_endpoint_serves_bodies_on_demand(self):
+        book = make_epub([sample_text(i) + ' lazy-epub' for i in range(3)])
+        data = self._upload(book, 'book.epub').get_json()
+
+        response = self.client.get(f"/books/{data['book_id']}/chapters/1")
+        self.assertEqual(response.status_code, 200)
+        chapter = response.get_json()
+        self.assertEqual(chapter['index'], 1)
+        self.assertIn('Section 1.', chapter['content'])
+        self.assertEqual(len(chapter['content']), data['chapters'][1]['size'])
+
+        toc = self.client.get(f"/books/{data['book_id']}").get_json()
+        self.assertEqual(toc['chapters'], data['chapters'])
+
+    def test_unknown_book_or_chapter_returns_404(self):
+        data = self._upload(make_pdf([sample_text(0) + ' lazy-404']), 'book.pdf').get_json()
+
+        self.assertEqual(self.client.get(f"/books/{data['book_id']}/chapters/5").status_code, 404)
+        self.assertEqual(self.client.get(f"/books/{'f' * 64}/chapters/0").status_code, 404)
+        self.assertEqual(self.client.get('/books/not-a-hash').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import openai
+
+from app import app, create_app, get_state
+from fake_openai import FakeOpenAIServer
+from text_chunks import estimate_tokens, split_into_chunks
+
+
+def long_chapter(paragraphs: int, marker: str) -> str:
+    paragraph = ("The crew argued late into the night about the route across the mountains. " * 12).strip()
+    return '\n\n'.join(f"{marker} paragraph {i}. {paragraph}" for i in range(paragraphs))
+
+
+class SplitIntoChunksTests(unittest.TestCase):
+    def test_chunks_respect_budget_and_keep_all_text(self):
+        text = long_chapter(30, 'split')
+        chunks = split_into_chunks(text, max_tokens=300)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 300)
+        self.assertEqual(''.join(chunks).replace('\n', ''), text.replace('\n', ''))
+
+    def test_oversized_sentences_are_hard_wrapped(self):
+        chunks = split_into_chunks('x' * 5000, max_tokens=100)
+        self.assertTrue(all(len(chunk) <= 400 for chunk in chunks))
+        self.assertEqual(''.join(chunks), 'x' * 5000)
+
+
+class MapReduceSummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.server = FakeOpenAIServer(latency=0.3).start()
+        self.addCleanup(self.server.stop)
+        fake_client = openai.OpenAI(api_key='dummy_key_for_testing', base_url=self.server.base_url, max_retries=0)
+        patcher = patch.object(get_state(app), 'client', fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _summarize(self, content, strategy, max_concurrency):
+        settings = dict(app.config['SUMMARY'], chunk_tokens=250, max_input_chars=1000,
+                        max_concurrency=max_concurrency)
+        with patch.dict(app.config, {'SUMMARY': settings}):
+            start = time.perf_counter()
+            response = self.client.post('/summarize', json={'content': content, 'strategy': strategy})
+            return response, time.perf_counter() - start
+
+    def test_chunks_are_summarized_concurrently_then_reduced(self):
+        content = long_chapter(8, 'concurrent')
+        response, elapsed = self._summarize(content, 'map_reduce', max_concurrency=8)
+
+        self.assertEqual(response.status_code, 200)
+        map_requests = self.server.requests[:-1]
+        self.assertEqual(len(map_requests), len(split_into_chunks(content, 250)))
+        self.assertGreaterEqual(len(map_requests), 8)
+        self.assertIn('combine them into a single brief summary', self.server.requests[-1]['messages'][-1]['content'])
+        # One map round plus one reduce call, not one call per chunk in sequence
+        self.assertLess(elapsed, 0.3 * len(map_requests))
+        self.assertLess(elapsed, 1.5)
+
+    def test_in_flight_requests_are_bounded(self):
+        response, _ = self._summarize(long_chapter(8, 'bounded'), 'map_reduce', max_concurrency=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.max_in_flight, 3)
+
+    def test_auto_strategy_keeps_short_content_to_one_call(self):
+        response, _ = self._summarize('A short chapter that fits in a single request easily.', 'auto', 4)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_truncate_strategy_ignores_the_tail(self):
+        response, _ = self._summarize(long_chapter(8, 'truncate'), 'truncate', 4)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stream_runs_map_phase_then_streams_the_reduce(self):
+        settings = dict(app.config['SUMMARY'], chunk_tokens=250, max_input_chars=1000)
+        with patch.dict(app.config, {'SUMMARY': settings}):
+            response = self.client.post('/summarize/stream',
+                                        json={'content': long_chapter(4, 'stream'), 'strategy': 'auto'})
+            body = response.get_data(as_text=True)
+
+        self.assertIn('event: token', body)
+        self.assertIn('event: done', body)
+        self.assertTrue(self.server.requests[-1]['stream'])
+        self.assertFalse(any(request.get('stream') for request in self.server.requests[:-1]))
+
+    def test_reduce_input_that_is_still_too_long_is_logged(self):
+        with patch('app.MAX_REDUCE_LEVELS', 0), self.assertLogs('app', 'WARNING') as logs:
+            response, _ = self._summarize(long_chapter(40, 'overflow'), 'map_reduce', max_concurrency=64)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('after 0 reduce rounds' in line for line in logs.output))
+
+    def test_chunks_larger_than_a_request_are_rejected_at_startup(self):
+        with self.assertRaises(ValueError):
+            create_app({'SUMMARY': dict(app.config['SUMMARY'], chunk_tokens=2000, max_input_chars=4000)})
+
+    def test_unknown_strategy_is_rejected(self):
+        response, _ = self._summarize(long_chapter(2, 'unknown'), 'everything', 4)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
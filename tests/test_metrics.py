@@ -0,0 +1,111 @@
+import io
+import re
+import time
+import unittest
+from unittest.mock import patch
+
+import openai
+
+from app import app, get_state
+from book_factory import make_epub, sample_text
+from fake_openai import FakeOpenAIServer
+from metrics import Registry, server_timing
+
+
+def sample(text: str, name: str) -> float:
+    """Return the value of one sample line, e.g. ``name='foo_count{format="epub"}'``."""
+    match = re.search(rf'^{re.escape(name)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+class RegistryTests(unittest.TestCase):
+    def test_counters_and_histograms_render_in_text_format(self):
+        registry = Registry()
+        requests = registry.counter('requests_total', 'Requests handled', ['status'])
+        latency = registry.histogram('latency_seconds', 'Request latency', buckets=(0.1, 1))
+        requests.inc(status='ok')
+        requests.inc(2, status='ok')
+        requests.inc(status='say "hi"\n')
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+
+        text = registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{status="ok"} 3', text)
+        self.assertIn('requests_total{status="say \\"hi\\"\\n"} 1', text)
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        # Buckets are cumulative
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum 5.55', text)
+        self.assertIn('latency_seconds_count 3', text)
+
+    def test_labels_must_match_declared_names(self):
+        counter = Registry().counter('events_total', 'Events', ['kind'])
+        with self.assertRaises(ValueError):
+            counter.inc(other='x')
+
+    def test_server_timing_adds_up_repeated_phases(self):
+        header = server_timing([('openai', 0.25), ('json', 0.001), ('openai', 0.5)])
+        self.assertEqual(header, 'openai;dur=750.0, json;dur=1.0')
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _metrics(self) -> str:
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_upload_is_measured_and_broken_down_in_server_timing(self):
+        before = self._metrics()
+        book = make_epub([sample_text(i) + f' metrics-{time.time_ns()}' for i in range(3)])
+        response = self.client.post('/upload', data={'file': (io.BytesIO(book), 'book.epub')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+
+        phases = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(phases, ['receive', 'hash', 'extract', 'index', 'store', 'json', 'total'])
+
+        after = self._metrics()
+        self.assertEqual(sample(after, 'book_reader_upload_bytes_count') - sample(before, 'book_reader_upload_bytes_count'), 1)
+        unit = 'book_reader_extract_unit_seconds_count{format="epub"}'
+        self.assertEqual(sample(after, unit) - sample(before, unit), 3)
+        book_count = 'book_reader_extract_book_seconds_count{format="epub"}'
+        self.assertEqual(sample(after, book_count) - sample(before, book_count), 1)
+        self.assertGreater(sample(after, 'book_reader_json_serialize_seconds_count'), 0)
+        rate_limited = 'book_reader_rate_limit_checks_total{result="allowed"}'
+        self.assertGreater(sample(after, rate_limited), sample(before, rate_limited))
+
+        # The same book again is a book cache hit and is not parsed
+        self.client.post('/upload', data={'file': (io.BytesIO(book), 'book.epub')}, content_type='multipart/form-data')
+        hits = 'book_reader_cache_requests_total{cache="book",result="hit"}'
+        self.assertGreater(sample(self._metrics(), hits), sample(after, hits))
+
+    def test_model_latency_and_token_usage_are_recorded(self):
+        with FakeOpenAIServer(latency=0.05) as server:
+            client = openai.OpenAI(api_key='dummy', base_url=server.base_url, max_retries=0)
+            try:
+                with patch.object(get_state(app), 'client', client):
+                    before = self._metrics()
+                    response = self.client.post('/summarize', json={'content': f'A measured chapter {time.time_ns()}.'})
+            finally:
+                client.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.headers['Server-Timing'], r'^cache;dur=[\d.]+, openai;dur=[\d.]+, json;dur=')
+
+        after = self._metrics()
+        latency = 'book_reader_openai_request_seconds_count{mode="complete",outcome="ok"}'
+        self.assertEqual(sample(after, latency) - sample(before, latency), 1)
+        prompt = 'book_reader_openai_tokens_sum{kind="prompt"}'
+        self.assertEqual(sample(after, prompt) - sample(before, prompt), 10)
+        misses = 'book_reader_cache_requests_total{cache="summary",result="miss"}'
+        self.assertEqual(sample(after, misses) - sample(before, misses), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
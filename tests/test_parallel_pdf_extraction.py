@@ -0,0 +1,121 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import pdf_extract
+from app import app, extract_chapters_pdf, get_state
+from book_factory import make_pdf, sample_text
+from pdf_extract import split_range
+
+
+class BreaksAfterFirstBatch:
+    """A pool whose workers die after the first batch."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def map(self, fn, *iterables):
+        for i, args in enumerate(zip(*iterables)):
+            if i == 1:
+                raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+            yield fn(*args)
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+class SlowPool:
+    """A pool that keeps its caller waiting before handing over each batch."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def map(self, fn, *iterables):
+        for args in zip(*iterables):
+            time.sleep(self.delay)
+            yield fn(*args)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class ParallelPdfExtractionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Every fourth page is blank and must be skipped in both modes
+        pages = ['' if i % 4 == 3 else sample_text(i) for i in range(40)]
+        fd, cls.pdf_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_pdf(pages))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.pdf_path)
+
+    def setUp(self):
+        context = app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_parallel_mode_matches_serial_order_and_content(self):
+        with patch.dict(app.config, {'PDF_PARALLEL_MIN_PAGES': 1}):
+            serial = list(extract_chapters_pdf(self.pdf_path, workers=1))
+            parallel = list(extract_chapters_pdf(self.pdf_path, workers=2))
+
+        self.assertEqual(len(serial), 30)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(serial[3]['title'], 'Page 5')
+
+    def test_in_memory_pdf_is_spilled_to_one_temporary_file(self):
+        with open(self.pdf_path, 'rb') as f:
+            data = f.read()
+        with tempfile.TemporaryDirectory() as uploads, \
+                patch.dict(app.config, {'PDF_PARALLEL_MIN_PAGES': 1, 'UPLOAD_FOLDER': uploads}):
+            serial = list(extract_chapters_pdf(self.pdf_path, workers=1))
+            chapters = extract_chapters_pdf(io.BytesIO(data), workers=2)
+            parallel = [next(chapters)]
+            self.assertEqual(len(os.listdir(uploads)), 1)
+            parallel.extend(chapters)
+            self.assertEqual(os.listdir(uploads), [])
+        self.assertEqual(parallel, serial)
+
+    def test_broken_pool_is_replaced_and_the_book_finished_in_process(self):
+        pool = BreaksAfterFirstBatch()
+        with patch.dict(app.config, {'PDF_PARALLEL_MIN_PAGES': 1}), \
+                patch.object(pdf_extract, '_executor', pool), patch.object(pdf_extract, '_executor_workers', 2):
+            serial = list(extract_chapters_pdf(self.pdf_path, workers=1))
+            parallel = list(extract_chapters_pdf(self.pdf_path, workers=2))
+            self.assertIsNone(pdf_extract._executor)
+        self.assertTrue(pool.shut_down)
+        self.assertEqual(parallel, serial)
+
+    def test_pages_are_timed_where_they_are_extracted(self):
+        metric = get_state(app).metrics.extract_unit_seconds
+        with patch.dict(app.config, {'PDF_PARALLEL_MIN_PAGES': 1}), \
+                patch.object(pdf_extract, '_executor', SlowPool(delay=0.2)), \
+                patch.object(pdf_extract, '_executor_workers', 2), \
+                patch.object(metric, 'observe') as observe:
+            list(extract_chapters_pdf(self.pdf_path, workers=2))
+        # One observation per non-empty page, none of them the wait for its batch
+        self.assertEqual(observe.call_count, 30)
+        self.assertLess(max(call.args[0] for call in observe.call_args_list), 0.2)
+        self.assertEqual({call.kwargs['format'] for call in observe.call_args_list}, {'pdf'})
+
+    def test_small_pdfs_stay_in_process(self):
+        with patch.dict(app.config, {'PDF_PARALLEL_MIN_PAGES': 1000}), \
+                patch('pdf_extract.extract_pages_parallel', side_effect=AssertionError('should not use the pool')):
+            self.assertEqual(len(list(extract_chapters_pdf(self.pdf_path, workers=4))), 30)
+
+    def test_split_range_covers_every_page_once(self):
+        for page_count, workers in [(1, 4), (10, 2), (1000, 3), (2001, 8)]:
+            batches = split_range(page_count, workers)
+            covered = [i for start, stop in batches for i in range(start, stop)]
+            self.assertEqual(covered, list(range(page_count)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import tempfile
+import time
+import unittest
+from multiprocessing import get_context
+from unittest.mock import patch
+
+from app import app, get_state
+from book_factory import make_epub, sample_text
+from rate_limiter import RateLimiter
+
+
+def hit_many(path, key, count):
+    limiter = RateLimiter(path, requests=10, window=3600)
+    return sum(limiter.hit(key).allowed for _ in range(count))
+
+
+class RateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = f'{self.tmpdir.name}/ratelimit.sqlite3'
+
+    def test_each_client_has_its_own_budget(self):
+        limiter = RateLimiter(self.path, requests=3, window=3600)
+        self.assertEqual([limiter.hit('a').allowed for _ in range(4)], [True, True, True, False])
+        self.assertTrue(limiter.hit('b').allowed)
+
+    def test_tokens_refill_over_time(self):
+        limiter = RateLimiter(self.path, requests=2, window=60)
+        now = time.time()
+        with patch('rate_limiter.time.time', return_value=now):
+            limiter.hit('a')
+            limiter.hit('a')
+            denied = limiter.hit('a')
+        self.assertFalse(denied.allowed)
+        self.assertAlmostEqual(denied.retry_after, 30, delta=1)
+
+        with patch('rate_limiter.time.time', return_value=now + 31):
+            self.assertTrue(limiter.hit('a').allowed)
+
+    def test_limit_is_shared_across_processes(self):
+        with get_context('spawn').Pool(2) as pool:
+            allowed = pool.starmap(hit_many, [(self.path, 'shared', 8), (self.path, 'shared', 8)])
+        self.assertEqual(sum(allowed), 10)
+
+
+class RateLimitHeaderTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        limiter = RateLimiter(f'{self.tmpdir.name}/ratelimit.sqlite3', requests=2, window=3600)
+        patcher = patch.object(get_state(app), 'rate_limiter', limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_headers_and_retry_after(self):
+        first = self.client.get('/')
+        self.assertEqual(first.headers['X-RateLimit-Limit'], '2')
+        self.assertEqual(first.headers['X-RateLimit-Remaining'], '1')
+
+        self.client.get('/')
+        denied = self.client.get('/')
+        self.assertEqual(denied.status_code, 429)
+        self.assertEqual(denied.headers['X-RateLimit-Remaining'], '0')
+        self.assertEqual(denied.headers['Retry-After'], '1800')
+
+    def test_clients_are_keyed_by_forwarded_address(self):
+        for _ in range(2):
+            self.client.get('/', headers={'X-Forwarded-For': '203.0.113.7'})
+        self.assertEqual(self.client.get('/', headers={'X-Forwarded-For': '203.0.113.7'}).status_code, 429)
+        self.assertEqual(self.client.get('/', headers={'X-Forwarded-For': '203.0.113.8'}).status_code, 200)
+
+    def test_chapter_reads_are_not_limited(self):
+        book = make_epub([sample_text(i) + ' limit-chapters' for i in range(2)])
+        upload = self.client.post('/upload', data={'file': (io.BytesIO(book), 'book.epub')},
+                                  content_type='multipart/form-data')
+        book_id = upload.get_json()['book_id']
+        self.client.get('/')
+        self.assertEqual(self.client.get('/').status_code, 429)
+        for _ in range(5):
+            self.assertEqual(self.client.get(f'/books/{book_id}/chapters/1').status_code, 200)
+            # The cached-summary lookup made next to every chapter load is free too
+            self.assertEqual(self.client.get(f'/books/{book_id}/chapters/1/summary').status_code, 404)
+
+    def test_job_polling_is_not_limited(self):
+        self.client.get('/')
+        self.client.get('/')
+        for _ in range(5):
+            self.assertEqual(self.client.get('/jobs/does-not-exist').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,313 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import openai
+
+from app import app, get_chapter_summary, get_state, guard_openai_call
+from fake_openai import FakeOpenAIServer
+from resilience import (AsyncSingleFlight, CircuitBreaker, CircuitOpenError, DeadlineExceededError, SingleFlight,
+                        call_with_retries)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_consecutive_failures_and_recovers_after_a_trial_call(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError) as raised:
+            breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 10)
+
+        clock.now = 10
+        breaker.before_call()  # The trial call
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()  # Only one trial at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        clock.now = 20
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.before_call()
+
+    def test_a_cancelled_trial_call_releases_the_trial(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.before_call()
+        breaker.record_failure()
+        clock.now = 10
+        with app.app_context(), patch.object(get_state(app), 'openai_breaker', breaker):
+            with self.assertRaises(asyncio.CancelledError):
+                with guard_openai_call():
+                    raise asyncio.CancelledError()
+        self.assertEqual(breaker.state, 'open')
+
+        clock.now = 20
+        breaker.before_call()  # A new trial is allowed once the timeout passes again
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_a_trial_abandoned_before_its_request_gives_no_verdict(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.before_call()
+        breaker.record_failure()
+        clock.now = 10
+        with app.app_context(), patch.object(get_state(app), 'openai_breaker', breaker):
+            with self.assertRaises(DeadlineExceededError):
+                with guard_openai_call():
+                    raise DeadlineExceededError('Summary service did not answer in time')
+        # The slot is free for the next trial right away, and the failure count is unchanged
+        breaker.before_call()
+        self.assertEqual(breaker.failures, 1)
+
+
+class RetryTests(unittest.TestCase):
+    def test_transient_failures_are_retried_with_growing_capped_delays(self):
+        calls = []
+        delays = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 4:
+                raise ConnectionError('reset')
+            return 'ok'
+
+        with patch('resilience.random.uniform', side_effect=lambda low, high: high):
+            result = call_with_retries(flaky, lambda e: isinstance(e, ConnectionError), attempts=4,
+                                       base_delay=0.5, max_delay=1.5, sleep=delays.append)
+        self.assertEqual(result, 'ok')
+        self.assertEqual(delays, [0.5, 1.0, 1.5])
+
+    def test_permanent_failures_and_the_last_attempt_are_raised(self):
+        delays = []
+        with self.assertRaises(KeyError):
+            call_with_retries(lambda: {}['missing'], lambda e: False, attempts=3, base_delay=1, max_delay=1,
+                              sleep=delays.append)
+        self.assertEqual(delays, [])
+
+        with self.assertRaises(ConnectionError):
+            call_with_retries(lambda: (_ for _ in ()).throw(ConnectionError()), lambda e: True, attempts=2,
+                              base_delay=0, max_delay=0, retry_after=lambda e: 30, sleep=delays.append)
+        # Retry-After is honoured only up to max_delay
+        self.assertEqual(delays, [0])
+
+    def test_no_retry_starts_past_the_deadline(self):
+        clock = Clock()
+        calls = []
+        delays = []
+
+        def slow_failure():
+            calls.append(1)
+            clock.now += 4
+            raise ConnectionError('timed out')
+
+        with patch('resilience.random.uniform', side_effect=lambda low, high: high), \
+                self.assertRaises(ConnectionError):
+            call_with_retries(slow_failure, lambda e: True, attempts=5, base_delay=1, max_delay=8,
+                              sleep=delays.append, deadline=10, clock=clock)
+        # Attempt 1 ends at 4 and waits 1s, attempt 2 ends at 9 and would wait 2s, past the deadline
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(delays, [1])
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution_and_its_exception(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow(result):
+            calls.append(1)
+            release.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(flights.do, 'key', lambda: slow('summary')) for _ in range(4)]
+            while flights.shared < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result == 'summary' for result, _ in results))
+
+        release.clear()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(flights.do, 'key', lambda: slow(RuntimeError('boom'))) for _ in range(2)]
+            while flights.shared < 4:
+                time.sleep(0.01)
+            release.set()
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+
+class AsyncSingleFlightTests(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution_and_its_exception(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def slow(result):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def run(result):
+            return await asyncio.gather(*(flights.do('key', lambda: slow(result)) for _ in range(4)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(run('summary'))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result == 'summary' for result, _ in results))
+
+        results = asyncio.run(run(RuntimeError('boom')))
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    def test_a_waiter_takes_over_when_the_leader_is_cancelled(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'summary'
+
+        async def run():
+            leader = asyncio.ensure_future(flights.do('key', slow))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.ensure_future(flights.do('key', slow))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await waiter
+
+        self.assertEqual(asyncio.run(run()), ('summary', False))
+        self.assertEqual(len(calls), 2)
+
+
+class ResilientSummaryTests(unittest.TestCase):
+    """End to end against the local fake OpenAI server."""
+
+    def setUp(self):
+        self.client = app.test_client()
+        patches = [
+            patch.dict(app.config['OPENAI_RETRY'], {'attempts': 3, 'base_delay': 0.01, 'max_delay': 0.05}),
+            patch.object(get_state(app), 'openai_breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30)),
+            patch.dict(app.config['SUMMARY'], {'fallback': False}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _use(self, server, **kwargs):
+        client = openai.OpenAI(api_key='dummy', base_url=server.base_url, max_retries=0, **kwargs)
+        self.addCleanup(client.close)
+        p = patch.object(get_state(app), 'client', client)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def _summarize(self, text):
+        return self.client.post('/summarize', json={'content': f'{text} {time.time_ns()}'})
+
+    def test_transient_errors_are_retried(self):
+        with FakeOpenAIServer(failures=2, failure_status=503) as server:
+            self._use(server)
+            response = self._summarize('A chapter that succeeds on the third attempt.')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        with FakeOpenAIServer(failures=1, failure_status=400) as server:
+            self._use(server)
+            response = self._summarize('A chapter the API refuses outright.')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_timeouts_are_retried_then_reported_as_unavailable(self):
+        with FakeOpenAIServer(latency=1.0) as server:
+            self._use(server, timeout=openai.Timeout(0.1, connect=0.1))
+            with patch.dict(app.config['OPENAI_RETRY'], {'attempts': 2}):
+                start = time.perf_counter()
+                response = self._summarize('A chapter the model is too slow to summarize.')
+                elapsed = time.perf_counter() - start
+            self.assertEqual(response.status_code, 503)
+            self.assertLess(elapsed, 1.0)
+            self.assertEqual(len(server.requests), 2)
+
+    def test_open_circuit_fails_fast_without_calling_the_api(self):
+        with FakeOpenAIServer(failures=100, failure_status=500) as server:
+            self._use(server)
+            response = self._summarize('A chapter sent while the API is down.')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(len(server.requests), 3)
+
+            response = self._summarize('Another chapter sent while the API is down.')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(int(response.headers['Retry-After']), 30)
+            self.assertEqual(len(server.requests), 3)
+
+    def test_interactive_summaries_fall_back_at_the_deadline(self):
+        with FakeOpenAIServer(latency=2.0) as server:
+            self._use(server)
+            with patch.dict(app.config['SUMMARY'], {'fallback': True, 'fallback_after': 0.5}):
+                start = time.perf_counter()
+                response = self._summarize('A chapter the model takes far too long to summarize. It has two sentences.')
+                elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['engine'], 'extractive')
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_summaries_without_fallback_keep_the_full_retry_budget(self):
+        with FakeOpenAIServer(latency=0.4) as server:
+            self._use(server)
+            with patch.dict(app.config['SUMMARY'], {'fallback_after': 0.1}), app.app_context():
+                summary, engine = get_chapter_summary('A chapter a background job summarizes slowly but surely.',
+                                                      fallback=False)
+        self.assertEqual(engine, 'remote')
+        self.assertTrue(summary.startswith('Summary of'))
+
+    def test_identical_concurrent_requests_share_one_model_call(self):
+        content = f'A chapter the whole class opens at once {time.time_ns()}.'
+        with FakeOpenAIServer(latency=0.3) as server:
+            self._use(server)
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                responses = list(pool.map(lambda _: self.client.post('/summarize', json={'content': content}),
+                                          range(8)))
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(len({response.get_json()['summary'] for response in responses}), 1)
+        self.assertEqual(sum(not response.get_json()['cached'] for response in responses), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import time
+import unittest
+
+from app import app, get_state
+from book_factory import make_epub, make_pdf, sample_text
+from search_index import SearchIndex, decode_varints, encode_varints, html_to_text, make_snippet
+
+
+class SearchIndexTests(unittest.TestCase):
+    def test_varints_round_trip(self):
+        numbers = [0, 1, 127, 128, 300, 16384, 2 ** 31]
+        encoded = encode_varints(numbers)
+        self.assertEqual(decode_varints(encoded), numbers)
+        self.assertEqual(len(encode_varints([5] * 100)), 100)
+
+    def test_postings_round_trip_through_storage_members(self):
+        chapters = [{'title': 'A', 'content': 'the cat sat on the mat'},
+                    {'title': 'B', 'content': '<p>A dog &amp; the cat</p>'}]
+        index = SearchIndex.from_members(SearchIndex.build(chapters).to_members())
+
+        self.assertEqual(index.lookup('the'), {0: [0, 4], 1: [2]})
+        self.assertEqual(index.lookup('cat'), {0: [1], 1: [3]})
+        self.assertEqual(index.lookup('amp'), {})
+        self.assertEqual(index.lengths, [6, 4])
+
+    def test_phrase_matches_rank_first(self):
+        chapters = [
+            {'title': 'Words', 'content': 'lamp ' * 5 + 'the flickered ' * 5},
+            {'title': 'Phrase', 'content': 'a long evening and then the lamp flickered once'},
+            {'title': 'Neither', 'content': 'nothing relevant here'},
+        ]
+        hits = SearchIndex.build(chapters).search('lamp flickered')
+
+        self.assertEqual([hit['index'] for hit in hits], [1, 0])
+        self.assertTrue(hits[0]['phrase'])
+        self.assertEqual(hits[0]['positions'], [6])
+        self.assertFalse(hits[1]['phrase'])
+
+    def test_html_is_reduced_to_visible_text(self):
+        text = html_to_text('<html><head><title>Hidden</title><style>p {}</style></head>'
+                            '<body><p>Fish &amp; chips</p></body></html>')
+        self.assertEqual(text.split(), ['Fish', '&', 'chips'])
+
+    def test_snippet_is_trimmed_to_word_boundaries(self):
+        text = ' '.join(f'word{i}' for i in range(100))
+        snippet = make_snippet(text, text.index('word50'), width=20)
+        self.assertTrue(snippet.startswith('…word'))
+        self.assertTrue(snippet.endswith('…'))
+        self.assertIn('word50', snippet)
+
+    def test_queries_on_a_thousand_page_book_take_milliseconds(self):
+        chapters = [{'title': f'Page {i}', 'content': sample_text(i, repeat=6)} for i in range(1000)]
+        chapters[700]['content'] += ' an unmistakable needle phrase '
+        index = SearchIndex.from_members(SearchIndex.build(chapters).to_members())
+
+        start = time.perf_counter()
+        rare = index.search('unmistakable needle')
+        common = index.search('the reader turned the page')
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(rare[0]['index'], 700)
+        self.assertEqual(len(common), 20)
+        self.assertLess(elapsed, 0.25)
+
+
+class SearchEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload(self, data: bytes, filename: str) -> str:
+        response = self.client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                                    content_type='multipart/form-data')
+        return response.get_json()['book_id']
+
+    def test_search_returns_ranked_hits_with_snippets(self):
+        chapters = [sample_text(i) for i in range(5)]
+        chapters[3] += ' The lighthouse keeper counted the ships.'
+        book_id = self._upload(make_epub(chapters), 'search.epub')
+
+        response = self.client.get(f'/books/{book_id}/search', query_string={'q': 'lighthouse keeper'})
+        self.assertEqual(response.status_code, 200)
+        hits = response.get_json()['hits']
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]['index'], 3)
+        self.assertEqual(hits[0]['title'], 'chap_0004.xhtml')
+        self.assertIn('lighthouse keeper', hits[0]['snippet'])
+        self.assertTrue(hits[0]['phrase'])
+
+    def test_index_is_persisted_with_the_book(self):
+        book_id = self._upload(make_pdf([sample_text(i) + ' persisted-index' for i in range(3)]), 'search.pdf')
+        members = get_state(app).book_store.get_index(book_id)
+        self.assertEqual(sorted(members), ['postings.bin', 'terms.json'])
+        self.assertIn('persisted', SearchIndex.from_members(members).terms)
+
+    def test_invalid_requests(self):
+        book_id = self._upload(make_epub([sample_text(0) + ' invalid-search']), 'search.epub')
+        self.assertEqual(self.client.get(f'/books/{book_id}/search').status_code, 400)
+        self.assertEqual(self.client.get(f'/books/{book_id}/search?q=' + 'x' * 500).status_code, 400)
+        self.assertEqual(self.client.get(f"/books/{'0' * 64}/search?q=word").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
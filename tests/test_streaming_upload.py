@@ -0,0 +1,75 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from app import app
+from book_factory import make_pdf, make_epub, sample_text
+
+
+class StreamingUploadTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload(self, data: bytes, filename: str, **kwargs):
+        return self.client.post('/upload?stream=1', data={'file': (io.BytesIO(data), filename)},
+                                content_type='multipart/form-data', **kwargs)
+
+    def _lines(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_chapters_are_streamed_then_stored(self):
+        pages = [sample_text(i) + ' stream-pdf' for i in range(3)]
+        response = self._upload(make_pdf(pages), 'book.pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = self._lines(response)
+        self.assertEqual([line['type'] for line in lines], ['book', 'chapter', 'chapter', 'chapter', 'done'])
+        book_id = lines[0]['book_id']
+        self.assertEqual([line['index'] for line in lines[1:4]], [0, 1, 2])
+        self.assertIn('stream-pdf', lines[1]['content'])
+        self.assertNotIn('content', lines[2])
+
+        toc = self.client.get(f'/books/{book_id}').get_json()['chapters']
+        self.assertEqual(toc, [{'title': line['title'], 'size': line['size']} for line in lines[1:4]])
+
+    def test_first_chapter_is_sent_before_extraction_finishes(self):
+        book = make_epub([sample_text(i) + ' stream-early' for i in range(3)])
+        finished = []
+
+        def slow_extract(source, book_id=None):
+            yield {'title': 'One', 'content': 'First'}
+            yield {'title': 'Two', 'content': 'Second'}
+            finished.append(True)
+
+        with patch('app.extract_chapters_epub', side_effect=slow_extract):
+            response = self._upload(book, 'book.epub', buffered=False)
+            chunks = iter(response.response)
+            first = b''
+            while first.count(b'\n') < 2:
+                first += next(chunks)
+            self.assertEqual(finished, [])
+            rest = b''.join(chunks)
+            response.close()
+
+        lines = [json.loads(line) for line in (first + rest).decode('utf-8').splitlines()]
+        self.assertEqual(lines[1], {'type': 'chapter', 'index': 0, 'title': 'One', 'size': 5, 'content': 'First'})
+        self.assertEqual(lines[-1]['type'], 'done')
+        self.assertEqual(finished, [True])
+
+    def test_reupload_streams_the_stored_book(self):
+        book = make_epub([sample_text(i) + ' stream-cached' for i in range(2)])
+        first = self._lines(self._upload(book, 'book.epub'))
+
+        with patch('app.extract_chapters_epub', side_effect=AssertionError('should not parse')):
+            second = self._lines(self._upload(book, 'book.epub'))
+        self.assertEqual(first, second)
+
+    def test_extraction_failure_ends_with_error_line(self):
+        lines = self._lines(self._upload(b'not a pdf', 'book.pdf'))
+        self.assertEqual(lines[-1], {'type': 'error', 'error': 'Failed to process PDF file'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import app, get_state, summary_cache_key
+from summary_cache import SummaryCache, make_summary_key
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class SummaryCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = f'{self.tmpdir.name}/summaries.sqlite3'
+
+    def test_key_depends_on_model_parameters(self):
+        base = make_summary_key('text', 'gpt-3.5-turbo', 500, 0.7)
+        self.assertEqual(base, make_summary_key('text', 'gpt-3.5-turbo', 500, 0.7))
+        self.assertNotEqual(base, make_summary_key('text', 'gpt-4o', 500, 0.7))
+        self.assertNotEqual(base, make_summary_key('text', 'gpt-3.5-turbo', 200, 0.7))
+        self.assertNotEqual(base, make_summary_key('text', 'gpt-3.5-turbo', 500, 0.2))
+        self.assertNotEqual(base, make_summary_key('other', 'gpt-3.5-turbo', 500, 0.7))
+
+    def test_disk_tier_survives_a_new_process(self):
+        SummaryCache(self.path, ttl=60, max_entries=10, memory_entries=2).set('k', 'summary')
+
+        reopened = SummaryCache(self.path, ttl=60, max_entries=10, memory_entries=2)
+        self.assertEqual(reopened.get('k'), 'summary')
+        self.assertEqual(reopened.get('k'), 'summary')
+        self.assertEqual(reopened.stats()['disk_hits'], 1)
+        self.assertEqual(reopened.stats()['memory_hits'], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = SummaryCache(self.path, ttl=60, max_entries=10, memory_entries=2)
+        cache.set('k', 'summary')
+        with patch('summary_cache.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('k'))
+
+    def test_size_limit_evicts_least_recently_read(self):
+        cache = SummaryCache(self.path, ttl=60, max_entries=2, memory_entries=1, evict_every=1)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache._memory.clear()
+        cache.get('a')  # 'b' is now least recently read
+        cache.set('c', 'C')
+        cache._memory.clear()
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'C')
+
+    def test_eviction_is_amortized_over_writes(self):
+        cache = SummaryCache(self.path, ttl=60, max_entries=2, memory_entries=1, evict_every=4)
+        for key in 'abc':
+            cache.set(key, key.upper())
+        self.assertEqual(cache.stats()['entries'], 3)
+        cache.set('d', 'D')
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_disk_reads_are_recorded_in_batches(self):
+        cache = SummaryCache(self.path, ttl=60, max_entries=10, memory_entries=1)
+        cache.set('a', 'A')
+        cache._memory.clear()
+        (before,) = cache._db.execute("SELECT accessed FROM summaries WHERE key = 'a'").fetchone()
+        with patch('summary_cache.time.time', return_value=time.time() + 10):
+            self.assertEqual(cache.get('a'), 'A')
+        self.assertEqual(cache._db.execute("SELECT accessed FROM summaries WHERE key = 'a'").fetchone()[0], before)
+
+        cache.set('b', 'B')  # The next write records the pending read
+        self.assertGreater(cache._db.execute("SELECT accessed FROM summaries WHERE key = 'a'").fetchone()[0], before)
+
+
+class SummarizeCacheEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_second_request_is_served_from_cache(self):
+        payload = {'content': 'A chapter about caching that nobody has summarized before in this test run.'}
+        completions = get_state(app).client.chat.completions
+        with patch.object(completions, 'create', return_value=completion('Short summary.')) as create:
+            first = self.client.post('/summarize', json=payload)
+            second = self.client.post('/summarize', json=payload)
+
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(first.get_json(), {'summary': 'Short summary.', 'cached': False, 'engine': 'remote'})
+        self.assertEqual(second.get_json(), {'summary': 'Short summary.', 'cached': True, 'engine': 'remote'})
+
+    def test_key_ignores_text_beyond_the_model_input(self):
+        limit = app.config['SUMMARY']['max_input_chars']
+        prefix = 'x' * limit
+        with app.app_context():
+            self.assertEqual(summary_cache_key(prefix + 'tail one'), summary_cache_key(prefix + 'tail two'))
+
+    def test_failures_are_not_cached(self):
+        payload = {'content': 'A chapter whose first summary attempt fails with an upstream error.'}
+        completions = get_state(app).client.chat.completions
+        with patch.object(completions, 'create', side_effect=[RuntimeError('boom'), completion('Recovered.')]):
+            # The extractive fallback answers the failed attempt but is not cached
+            self.assertEqual(self.client.post('/summarize', json=payload).get_json()['engine'], 'extractive')
+            response = self.client.post('/summarize', json=payload)
+        self.assertEqual(response.get_json(), {'summary': 'Recovered.', 'cached': False, 'engine': 'remote'})
+
+
+if __name__ == '__main__':
+    unittest.main()
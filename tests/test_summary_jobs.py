@@ -0,0 +1,98 @@
+import io
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import app, get_state
+from book_factory import make_pdf, sample_text
+from request_budget import RequestBudget
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class RequestBudgetTests(unittest.TestCase):
+    def test_calls_are_paced_to_the_budget(self):
+        budget = RequestBudget(per_minute=600, burst=1)  # one call per 100ms
+        start = time.perf_counter()
+        for _ in range(4):
+            budget.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.28)
+
+    def test_timeout_gives_up_without_a_token(self):
+        budget = RequestBudget(per_minute=1, burst=1)
+        self.assertTrue(budget.acquire())
+        self.assertFalse(budget.acquire(timeout=0.01))
+
+    def test_zero_budget_disables_pacing(self):
+        budget = RequestBudget(per_minute=0)
+        for _ in range(100):
+            self.assertTrue(budget.acquire(timeout=0))
+
+
+class SummaryJobTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload_book(self, marker):
+        pages = [sample_text(i) + f' {marker}' for i in range(3)]
+        response = self.client.post('/upload', data={'file': (io.BytesIO(make_pdf(pages)), 'book.pdf')},
+                                    content_type='multipart/form-data')
+        return response.get_json()['book_id']
+
+    def _wait_for(self, job_id):
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            job = self.client.get(f'/jobs/{job_id}').get_json()
+            if job['status'] == 'completed':
+                return job
+            time.sleep(0.05)
+        self.fail('job did not finish')
+
+    def test_job_summarizes_every_chapter_into_the_cache(self):
+        book_id = self._upload_book('job-all')
+        completions = get_state(app).client.chat.completions
+        with patch.object(completions, 'create', return_value=completion('Background summary.')) as create:
+            response = self.client.post(f'/books/{book_id}/summaries')
+            self.assertEqual(response.status_code, 202)
+            job = self._wait_for(response.get_json()['job_id'])
+
+            self.assertEqual(create.call_count, 3)
+            self.assertEqual(job['completed'], 3)
+            self.assertEqual(job['failed'], 0)
+            self.assertEqual(job['results'], ['Background summary.'] * 3)
+
+            # Later interactive requests are served from the cache
+            chapter = self.client.get(f'/books/{book_id}/chapters/1').get_json()
+            summary = self.client.post('/summarize', json={'content': chapter['content'], 'strategy': 'auto'})
+            self.assertTrue(summary.get_json()['cached'])
+            self.assertEqual(create.call_count, 3)
+
+        ready = self.client.get(f'/books/{book_id}/chapters/2/summary')
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(ready.get_json()['summary'], 'Background summary.')
+
+    def test_failed_chapters_are_reported(self):
+        book_id = self._upload_book('job-fail')
+        with patch.object(get_state(app).client.chat.completions, 'create',
+                   side_effect=[completion('ok'), RuntimeError('boom'), completion('ok')]):
+            job = self._wait_for(self.client.post(f'/books/{book_id}/summaries').get_json()['job_id'])
+
+        self.assertEqual(job['completed'], 2)
+        self.assertEqual(job['failed'], 1)
+        self.assertEqual(len(job['errors']), 1)
+
+    def test_unknown_book_and_job_return_404(self):
+        self.assertEqual(self.client.post(f"/books/{'e' * 64}/summaries").status_code, 404)
+        self.assertEqual(self.client.get('/jobs/does-not-exist').status_code, 404)
+
+    def test_summary_lookup_does_not_call_the_model(self):
+        book_id = self._upload_book('job-lookup')
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=AssertionError('no model calls')):
+            self.assertEqual(self.client.get(f'/books/{book_id}/chapters/0/summary').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import app, get_state
+
+
+def stream_chunks(*tokens):
+    return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+                 for token in tokens])
+
+
+def parse_events(body: str):
+    events = []
+    for message in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class SummaryStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_tokens_are_forwarded_as_server_sent_events(self):
+        payload = {'content': 'A chapter that is streamed back to the reader token by token.'}
+        samples_before = len(get_state(app).ttft_samples)
+        completions = get_state(app).client.chat.completions
+        with patch.object(completions, 'create', return_value=stream_chunks('The ', 'hero ', 'wins.')) as create:
+            response = self.client.post('/summarize/stream', json=payload)
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/event-stream'))
+        self.assertTrue(create.call_args.kwargs['stream'])
+
+        events = parse_events(body)
+        self.assertEqual([data['token'] for event, data in events if event == 'token'], ['The ', 'hero ', 'wins.'])
+        self.assertEqual(events[-1][0], 'done')
+        self.assertFalse(events[-1][1]['cached'])
+        self.assertIsNotNone(events[-1][1]['ttft_ms'])
+        self.assertEqual(len(get_state(app).ttft_samples), samples_before + 1)
+
+        # The completed stream populates the summary cache
+        cached = self.client.post('/summarize', json=payload).get_json()
+        self.assertEqual(cached, {'summary': 'The hero wins.', 'cached': True, 'engine': 'remote'})
+
+    def test_upstream_failure_is_reported_as_error_event(self):
+        payload = {'content': 'A chapter whose streamed summary fails upstream.'}
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=RuntimeError('boom')), \
+                patch.dict(app.config['SUMMARY'], {'fallback': False}):
+            events = parse_events(self.client.post('/summarize/stream', json=payload).get_data(as_text=True))
+
+        self.assertEqual(events, [('error', {'error': 'Failed to generate summary'})])
+
+    def test_upstream_failure_falls_back_to_an_extractive_summary(self):
+        payload = {'content': 'A chapter whose model summary fails. The local engine answers instead.'}
+        with patch.object(get_state(app).client.chat.completions, 'create', side_effect=RuntimeError('boom')):
+            events = parse_events(self.client.post('/summarize/stream', json=payload).get_data(as_text=True))
+
+        self.assertEqual(events, [('token', {'token': payload['content']}),
+                                  ('done', {'cached': False, 'engine': 'extractive'})])
+
+    def test_short_content_is_rejected_before_streaming(self):
+        response = self.client.post('/summarize/stream', json={'content': 'short'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.get_json())
+
+    def test_stats_report_time_to_first_token(self):
+        stats = self.client.get('/stats').get_json()
+        self.assertIn('count', stats['summary_stream']['ttft'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import app as reader
+from app import app, get_state
+from book_factory import make_pdf, make_epub, sample_text
+
+
+class UploadSpoolingTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _upload(self, data: bytes, filename: str, client=None):
+        return (client or self.client).post('/upload', data={'file': (io.BytesIO(data), filename)},
+                                            content_type='multipart/form-data')
+
+    def _upload_files(self):
+        return [name for name in os.listdir(app.config['UPLOAD_FOLDER']) if name.startswith('upload-')]
+
+    def test_small_upload_is_parsed_from_memory(self):
+        book = make_epub([sample_text(i) + ' spool-memory' for i in range(2)])
+        sources = []
+        original = reader.extract_chapters_epub
+
+        def spy(source, book_id=None):
+            sources.append(source)
+            self.assertEqual(self._upload_files(), [])
+            return original(source, book_id)
+
+        before = get_state(app).upload_stats['in_memory']
+        with patch('app.extract_chapters_epub', side_effect=spy):
+            response = self._upload(book, 'book.epub')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(sources[0], io.BytesIO)
+        self.assertEqual(get_state(app).upload_stats['in_memory'], before + 1)
+
+    def test_large_upload_is_spooled_to_a_unique_file_and_removed(self):
+        pdf = make_pdf([sample_text(i) + ' spool-disk' for i in range(3)])
+        sources = []
+        original = reader.extract_chapters_pdf
+
+        def spy(source):
+            sources.append(source)
+            self.assertTrue(os.path.exists(source))
+            return original(source)
+
+        before = get_state(app).upload_stats['spooled']
+        with patch.dict(app.config, {'UPLOAD_SPOOL_MAX_BYTES': 0}), \
+                patch('app.extract_chapters_pdf', side_effect=spy):
+            response = self._upload(pdf, 'book.pdf')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['chapters']), 3)
+        self.assertEqual(os.path.dirname(sources[0]), app.config['UPLOAD_FOLDER'])
+        self.assertFalse(os.path.exists(sources[0]))
+        self.assertEqual(get_state(app).upload_stats['spooled'], before + 1)
+
+    def test_concurrent_uploads_with_the_same_name_do_not_collide(self):
+        books = [make_pdf([sample_text(i) + f' collide-{n}' for i in range(n + 2)]) for n in range(4)]
+        results = [None] * len(books)
+        before = get_state(app).upload_stats['spooled']
+
+        def upload(n):
+            results[n] = self._upload(books[n], 'book.pdf', client=app.test_client())
+
+        with patch.dict(app.config, {'UPLOAD_SPOOL_MAX_BYTES': 0}):
+            threads = [threading.Thread(target=upload, args=(n,)) for n in range(len(books))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for n, response in enumerate(results):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['chapters']), n + 2)
+        self.assertEqual(self._upload_files(), [])
+        self.assertEqual(get_state(app).upload_stats['spooled'], before + len(books))
+
+
+if __name__ == '__main__':
+    unittest.main()
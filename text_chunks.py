@@ -0,0 +1,49 @@
+import re
+from typing import List
+
+# Rough average for English prose with OpenAI tokenizers; good enough for
+# budgeting without pulling in a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in ``text``."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    """Split text into pieces no longer than ``max_chars``, preferring natural boundaries."""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            # Hard-wrap sentences that are longer than a whole chunk
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+    return [piece for piece in pieces if piece.strip()]
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into consecutive chunks of at most ``max_tokens`` estimated tokens.
+
+    Paragraphs are kept together where they fit, then sentences; only
+    sentences longer than a chunk are cut mid-way.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(text, max_chars):
+        if current and size + len(piece) + 1 > max_chars:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks